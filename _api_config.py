@@ -0,0 +1,107 @@
+"""
+Settings and HTTP session setup shared by the API test scripts
+
+Settings are parsed once at import, so scripts run in the same process share
+one parse.
+"""
+import threading
+import json
+import os
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+import config_cache
+
+try:
+    import orjson  # Optional: C JSON encoder/decoder
+except ImportError:
+    orjson = None
+
+try:
+    import httpx  # Optional: HTTP/2 client (pip install httpx[http2])
+    import h2  # noqa: F401 - needed by httpx for http2=True
+except ImportError:
+    httpx = None
+
+CONFIG_PATH = "config/settings.yaml"
+
+CONFIG = config_cache.load(CONFIG_PATH)
+ELEVEN = CONFIG.get("eleven_labs", {})
+VECTEEZY = CONFIG.get("vecteezy", {})
+
+# Request headers, built once and shared by every check
+ELEVEN_HEADERS = {
+    "xi-api-key": ELEVEN.get("api_key", ""),
+    "Content-Type": "application/json",
+}
+VECTEEZY_HEADERS = {
+    "Authorization": f"Bearer {VECTEEZY.get('api_key', '')}",
+    "Accept-Encoding": "gzip",
+}
+
+
+def json_dumps(obj):
+    """Encode a request body as JSON bytes"""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj).encode("utf-8")
+
+
+def json_loads(data):
+    """Decode a JSON response body"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+# Cap on requests in flight across every session, so parallel checks can't
+# trip provider rate limits (and the retry storms that follow)
+HTTP_SEMAPHORE = threading.BoundedSemaphore(int(os.getenv("ECHOAI_HTTP_CONCURRENCY", "4")))
+
+
+class _BoundedSession(requests.Session):
+    """Session whose requests each hold a slot of HTTP_SEMAPHORE"""
+
+    def request(self, *args, **kwargs):
+        with HTTP_SEMAPHORE:
+            return super().request(*args, **kwargs)
+
+
+def make_session(headers):
+    """Keep-alive session with a connection pool and backoff on 429/5xx
+    (honouring Retry-After)"""
+    session = _BoundedSession()
+    session.headers.update(headers)
+    session.mount("https://", HTTPAdapter(
+        pool_connections=4,
+        pool_maxsize=8,
+        max_retries=Retry(
+            total=3,
+            backoff_factor=1.0,
+            status_forcelist=[429, 500, 502, 503, 504],
+            respect_retry_after_header=True,
+            allowed_methods=["GET", "POST"],
+        ),
+    ))
+    return session
+
+
+if httpx is not None:
+    class _BoundedClient(httpx.Client):
+        """HTTP/2 client whose requests each hold a slot of HTTP_SEMAPHORE"""
+
+        def send(self, *args, **kwargs):
+            with HTTP_SEMAPHORE:
+                return super().send(*args, **kwargs)
+
+
+def make_http2_client(headers):
+    """HTTP/2 client, or None if httpx[http2] isn't installed
+
+    Concurrent requests to one host are multiplexed over a single connection,
+    so only one TCP+TLS handshake is paid.
+    """
+    if httpx is None:
+        return None
+    return _BoundedClient(http2=True, headers=headers, timeout=10)
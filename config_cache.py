@@ -0,0 +1,44 @@
+"""
+Parsed-YAML cache for settings files
+
+The parsed config is stored as JSON next to the YAML file (settings.yaml.cache)
+together with the file's mtime and size, and only re-parsed when those change.
+JSON rather than pickle, so reading the cache can never run code.
+"""
+from pathlib import Path
+import json
+import os
+
+import yaml
+
+try:
+    from yaml import CSafeLoader as SafeLoader  # libyaml C parser
+except ImportError:
+    from yaml import SafeLoader
+
+
+def load(path):
+    """Load a YAML file, reusing the cached parse if the file is unchanged"""
+    st = os.stat(path)
+    key = [st.st_mtime_ns, st.st_size]
+    cache = Path(f"{path}.cache")
+
+    try:
+        cached = json.loads(cache.read_text(encoding="utf-8"))
+        if cached["key"] == key:
+            return cached["data"]
+    except (OSError, ValueError, KeyError, TypeError):
+        pass  # Missing, unreadable or old-format cache - parse the YAML
+
+    with open(path, "r", encoding="utf-8") as f:
+        data = yaml.load(f, Loader=SafeLoader)
+
+    try:
+        text = json.dumps({"key": key, "data": data})
+        # Only cache settings that survive the round trip unchanged (YAML
+        # allows e.g. dates and non-string keys, which JSON doesn't)
+        if json.loads(text)["data"] == data:
+            cache.write_text(text, encoding="utf-8")
+    except (OSError, TypeError, ValueError):
+        pass
+    return data
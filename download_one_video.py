@@ -52,6 +52,8 @@ for vid in data["videos"]:
             video_response = requests.get(video_url, stream=True, timeout=60)
             output_path = VIDEO_DIR / "video_03.mp4"
             
+            # Unlink first - the old file may be hardlinked into the media cache
+            output_path.unlink(missing_ok=True)
             with open(output_path, 'wb') as f:
                 for chunk in video_response.iter_content(chunk_size=8192):
                     f.write(chunk)
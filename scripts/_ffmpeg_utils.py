@@ -0,0 +1,415 @@
+"""
+Shared ffmpeg/config helpers for the render scripts
+"""
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from pathlib import Path
+import subprocess
+import contextlib
+import tempfile
+import threading
+import hashlib
+import shutil
+import re
+import json
+import os
+import wave
+import yaml
+
+try:
+    import av  # Optional: PyAV reads durations in-process from the header
+except ImportError:
+    av = None
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+OUTPUT_DIR = BASE_DIR / "output"
+CONFIG_PATH = BASE_DIR / "config" / "settings.yaml"
+PROBE_CACHE = OUTPUT_DIR / ".probe_cache.json"
+LOGO_CACHE_DIR = OUTPUT_DIR / ".logo_cache"
+
+# Known install locations, checked with a plain stat before searching PATH
+FFMPEG_PATHS = [
+    r"C:\Users\Walt\Downloads\ffmpeg\ffmpeg-master-latest-win64-gpl\bin\ffmpeg.exe",
+    r"C:\ffmpeg\bin\ffmpeg.exe",
+    r"C:\Program Files\ffmpeg\bin\ffmpeg.exe",
+    r"C:\Program Files (x86)\ffmpeg\bin\ffmpeg.exe",
+    r"C:\Program Files (x86)\HitPaw\HitPaw Watermark Remover\ffmpeg.exe",
+]
+
+
+@lru_cache(maxsize=1)
+def find_ffmpeg():
+    """Find ffmpeg executable (looked up once per process)"""
+    for path in FFMPEG_PATHS:
+        if Path(path).is_file():
+            return path
+
+    # Only walk PATH (x PATHEXT on Windows) if no known location matched
+    found = shutil.which("ffmpeg")
+    if found:
+        return found
+
+    raise FileNotFoundError(
+        "ffmpeg not found! Please add ffmpeg to your PATH or install it.\n"
+        "Download from: https://ffmpeg.org/download.html"
+    )
+
+
+@lru_cache(maxsize=1)
+def find_ffprobe():
+    """Find ffprobe executable, preferring the one shipped next to ffmpeg"""
+    ffmpeg = Path(find_ffmpeg())
+    sibling = ffmpeg.with_name(ffmpeg.name.replace("ffmpeg", "ffprobe"))
+    if sibling.parent != Path(".") and sibling.is_file():
+        return str(sibling)
+    if shutil.which("ffprobe"):
+        return "ffprobe"
+
+    raise FileNotFoundError(
+        "ffprobe not found! It ships with ffmpeg - make sure both are on your PATH.\n"
+        "Download from: https://ffmpeg.org/download.html"
+    )
+
+
+@lru_cache(maxsize=2)
+def load_config(job_override=True):
+    """Load settings from YAML config (parsed once per process)
+
+    With job_override, a job-specific output/settings.yaml takes precedence
+    over config/settings.yaml.
+    """
+    job_config = OUTPUT_DIR / "settings.yaml"
+    config_path = job_config if job_override and job_config.exists() else CONFIG_PATH
+    with open(config_path, "r", encoding="utf-8") as f:
+        return yaml.safe_load(f)
+
+
+def get_platform_size(config, platform):
+    """Return (width, height) for a platform, falling back to tiktok"""
+    platforms = config.get("platforms", {})
+    platform_spec = platforms.get(platform, platforms.get("tiktok")) or {}
+    return platform_spec.get("width", 1080), platform_spec.get("height", 1920)
+
+
+_probe_cache = None
+_probe_cache_lock = threading.Lock()
+
+
+def _cache_key(path):
+    """Cache key that changes whenever the file is replaced or edited"""
+    st = path.stat()
+    return f"{path.resolve()}|{st.st_mtime_ns}|{st.st_size}"
+
+
+def _load_probe_cache():
+    global _probe_cache
+    if _probe_cache is None:
+        try:
+            _probe_cache = json.loads(PROBE_CACHE.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            _probe_cache = {}
+    return _probe_cache
+
+
+def _is_current(key):
+    """True if a probe cache key still matches a file on disk"""
+    try:
+        _, rest = key.split("|", 1)
+        path, mtime_ns, size = rest.rsplit("|", 2)
+        st = Path(path).stat()
+    except (ValueError, OSError):
+        return False
+    return str(st.st_mtime_ns) == mtime_ns and str(st.st_size) == size
+
+
+def _save_probe_cache():
+    # Drop entries for files that have since been deleted or replaced, so
+    # the cache only ever holds the media currently on disk
+    for key in [key for key in _probe_cache if not _is_current(key)]:
+        del _probe_cache[key]
+    try:
+        PROBE_CACHE.parent.mkdir(parents=True, exist_ok=True)
+        PROBE_CACHE.write_text(json.dumps(_probe_cache), encoding="utf-8")
+    except OSError:
+        pass
+
+
+def run_ffmpeg(cmd, cwd=None):
+    """Run an ffmpeg command quietly, keeping only stderr for error reports
+
+    -nostats drops the per-frame progress line and -loglevel error trims
+    stderr down to actual problems; stdin and stdout go to DEVNULL.
+    """
+    cmd = [cmd[0], "-hide_banner", "-nostats", "-loglevel", "error", *cmd[1:]]
+    return subprocess.run(cmd, stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL,
+                          stderr=subprocess.PIPE, text=True, cwd=cwd)
+
+
+# "Duration: 00:01:02.50," line that ffmpeg -i prints for every input
+_DURATION_RE = re.compile(r"Duration: (\d+):(\d+):(\d+(?:\.\d+)?)")
+
+
+@lru_cache(maxsize=1)
+def _has_ffprobe():
+    """True if ffprobe is available; warns once if it isn't"""
+    try:
+        find_ffprobe()
+        return True
+    except FileNotFoundError:
+        print("   ffprobe not found - reading durations from ffmpeg instead (no stream info)")
+        return False
+
+
+def _ffmpeg_duration(path):
+    """Parse the container duration from `ffmpeg -i`, for ffmpeg-only installs"""
+    try:
+        result = subprocess.run([find_ffmpeg(), "-hide_banner", "-nostdin", "-i", str(path)],
+                                stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL,
+                                stderr=subprocess.PIPE, text=True, errors="replace")
+    except OSError:
+        return None
+    match = _DURATION_RE.search(result.stderr)
+    if not match:
+        return None
+    hours, minutes, seconds = match.groups()
+    return int(hours) * 3600 + int(minutes) * 60 + float(seconds)
+
+
+def _ffprobe_json(path, *args):
+    """Run ffprobe on a file and return its parsed JSON output"""
+    cmd = [find_ffprobe(), "-v", "error", *args, "-of", "json", str(path)]
+    result = subprocess.run(cmd, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE,
+                            stderr=subprocess.DEVNULL, text=True)
+    return json.loads(result.stdout)
+
+
+def _header_duration(path):
+    """Read duration straight from the file header, without spawning ffprobe
+
+    PCM WAV carries it in the RIFF header; anything else goes through PyAV
+    when it's installed. Returns None if neither applies.
+    """
+    if path.suffix.lower() == ".wav":
+        try:
+            with contextlib.closing(wave.open(str(path), "rb")) as f:
+                return f.getnframes() / float(f.getframerate())
+        except (wave.Error, EOFError, OSError):
+            pass  # Not PCM (e.g. MP3 data in a .wav) - fall through
+
+    if av is not None:
+        try:
+            with av.open(str(path)) as container:
+                if container.duration:
+                    return container.duration / av.time_base
+        except Exception:
+            pass
+    return None
+
+
+def _read_duration(path):
+    """Read container duration, from the header when possible, else ffprobe"""
+    duration = _header_duration(path)
+    if duration is not None:
+        return duration
+    if not _has_ffprobe():
+        return _ffmpeg_duration(path)
+    try:
+        data = _ffprobe_json(path, "-show_entries", "format=duration")
+        return float(data["format"]["duration"])
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+
+
+def _ffprobe_video_info(path):
+    """Read the first video stream's codec, size, frame rate and SAR, plus
+    the container duration - all from a single ffprobe run
+
+    Without ffprobe only the duration is known, so the clip never matches
+    the spec and simply gets re-encoded.
+    """
+    if not _has_ffprobe():
+        duration = _ffmpeg_duration(path)
+        return {"duration": duration} if duration is not None else None
+    try:
+        data = _ffprobe_json(
+            path, "-select_streams", "v:0",
+            "-show_entries",
+            "stream=codec_name,pix_fmt,width,height,r_frame_rate,sample_aspect_ratio:format=duration",
+        )
+        info = data["streams"][0]
+    except (OSError, ValueError, KeyError, IndexError, TypeError):
+        return None
+    try:
+        info["duration"] = float(data["format"]["duration"])
+    except (KeyError, ValueError, TypeError):
+        info["duration"] = None
+    return info
+
+
+def _cached_probe(kind, probe, path, save=True):
+    """Run a probe through the on-disk cache"""
+    path = Path(path)
+    try:
+        key = f"{kind}|{_cache_key(path)}"
+    except OSError:
+        return None
+
+    with _probe_cache_lock:
+        cache = _load_probe_cache()
+        if key in cache:
+            return cache[key]
+
+    value = probe(path)
+    if value is not None:
+        with _probe_cache_lock:
+            cache[key] = value
+            if save:
+                _save_probe_cache()
+    return value
+
+
+def _cached_probe_many(kind, probe, paths):
+    """Run a probe over several files concurrently, in input order"""
+    paths = list(paths)
+    if not paths:
+        return []
+    with ThreadPoolExecutor(max_workers=min(8, len(paths))) as pool:
+        values = list(pool.map(lambda p: _cached_probe(kind, probe, p, save=False), paths))
+    with _probe_cache_lock:
+        _save_probe_cache()
+    return values
+
+
+def probe_duration(path):
+    """Return media duration in seconds, or None if it can't be read
+
+    Results are cached in output/.probe_cache.json keyed by path, mtime
+    and size, so unchanged media is never probed twice.
+    """
+    return _cached_probe("duration", _read_duration, path)
+
+
+def probe_video_infos(paths):
+    """Probe video stream info (and duration) for several files concurrently"""
+    return _cached_probe_many("video", _ffprobe_video_info, paths)
+
+
+def matches_spec(info, width, height, fps=30):
+    """True if a probed clip is already H.264 yuv420p at the target size/fps/SAR"""
+    if not info:
+        return False
+    return (
+        info.get("codec_name") == "h264"
+        and info.get("pix_fmt") == "yuv420p"
+        and info.get("width") == width
+        and info.get("height") == height
+        and info.get("r_frame_rate") == f"{fps}/1"
+        and info.get("sample_aspect_ratio", "1:1") in ("1:1", "0:1", "N/A")
+    )
+
+
+def scaled_logo(logo_path, width):
+    """Return a copy of the logo pre-scaled to `width`, cached on disk
+
+    The cache is keyed by source path, mtime and width, so the scale runs
+    once instead of inside every render's filter graph. Returns None if the
+    copy can't be made; callers then scale in the graph as before.
+    """
+    logo_path = Path(logo_path)
+    try:
+        st = logo_path.stat()
+    except OSError:
+        return None
+
+    key = f"{logo_path.resolve()}|{st.st_mtime_ns}|{width}"
+    cached = LOGO_CACHE_DIR / f"{hashlib.sha1(key.encode('utf-8')).hexdigest()[:16]}.png"
+    if cached.exists():
+        return cached
+
+    ffmpeg = find_ffmpeg()
+
+    # Unique temp name, so renders running at once never write the same file
+    LOGO_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=LOGO_CACHE_DIR, suffix=".png")
+    os.close(fd)
+    tmp = Path(tmp)
+    cmd = [
+        ffmpeg, "-y", "-nostdin",
+        "-i", str(logo_path),
+        "-vf", f"scale={width}:-1:flags=lanczos",
+        "-frames:v", "1",
+        str(tmp),
+    ]
+    try:
+        result = run_ffmpeg(cmd)
+    except OSError:
+        tmp.unlink(missing_ok=True)
+        return None
+    if result.returncode != 0 or tmp.stat().st_size == 0:
+        tmp.unlink(missing_ok=True)
+        return None
+    os.replace(tmp, cached)
+    return cached
+
+
+# Hardware H.264 encoders in order of preference, with quality settings
+# roughly matching libx264 medium/CRF 23
+HW_ENCODERS = [
+    ("h264_nvenc", ["-c:v", "h264_nvenc", "-preset", "p4", "-tune", "hq", "-rc", "vbr", "-cq", "23", "-b:v", "0"]),
+    ("h264_qsv", ["-c:v", "h264_qsv", "-preset", "medium", "-global_quality", "23"]),
+    ("h264_videotoolbox", ["-c:v", "h264_videotoolbox", "-q:v", "65"]),
+]
+
+
+@lru_cache(maxsize=1)
+def get_encoder_choice():
+    """Return the arguments of a working hardware encoder, or None
+
+    Being listed in 'ffmpeg -encoders' only means the build supports it, so
+    each candidate is checked with a tiny test encode. Runs once per process;
+    set video.hardware_encoding: false in settings.yaml to always use libx264.
+    """
+    if not load_config().get("video", {}).get("hardware_encoding", True):
+        return None
+
+    ffmpeg = find_ffmpeg()
+    try:
+        listed = subprocess.run([ffmpeg, "-hide_banner", "-encoders"], stdin=subprocess.DEVNULL,
+                                stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True).stdout
+    except OSError:
+        return None
+
+    for name, args in HW_ENCODERS:
+        if name not in listed:
+            continue
+        test_cmd = [
+            ffmpeg, "-hide_banner", "-nostdin", "-loglevel", "error",
+            "-f", "lavfi", "-i", "color=black:s=256x256:d=0.2",
+            *args, "-pix_fmt", "yuv420p", "-f", "null", "-",
+        ]
+        try:
+            if subprocess.run(test_cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                              timeout=15).returncode == 0:
+                return args
+        except (OSError, subprocess.TimeoutExpired):
+            continue
+    return None
+
+
+def hwaccel_args():
+    """Input options that let ffmpeg decode on the GPU when we encode on it"""
+    return ["-hwaccel", "auto"] if get_encoder_choice() else []
+
+
+def pick_encoder(intermediate=False):
+    """Return the ffmpeg video encoder arguments
+
+    Final renders use a hardware encoder when one works (see
+    get_encoder_choice), else libx264 medium/CRF 23. Intermediate files get
+    re-encoded by a later pass, so they trade file size for speed:
+    ultrafast with a low CRF keeps the quality loss invisible.
+    """
+    if intermediate:
+        return ["-c:v", "libx264", "-preset", "ultrafast", "-crf", "18",
+                "-g", "30", "-keyint_min", "30"]
+    return get_encoder_choice() or ["-c:v", "libx264", "-preset", "medium", "-crf", "23"]
@@ -0,0 +1,26 @@
+"""
+Shared HTTP session setup for the stock-media downloaders
+"""
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# Download chunk size - ~128 KiB keeps per-chunk Python overhead negligible
+CHUNK_SIZE = 128 * 1024
+
+
+def make_session(pool_connections=4, pool_maxsize=8, backoff=0.3):
+    """Pooled session with retry/backoff on 429/5xx
+
+    Each downloader keeps one for every API call and download, so TCP/TLS
+    connections are reused across keywords.
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=pool_connections,
+        pool_maxsize=pool_maxsize,
+        max_retries=Retry(total=3, backoff_factor=backoff, status_forcelist=[429, 500, 502, 503, 504]),
+    )
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
@@ -0,0 +1,52 @@
+"""
+Shared keyword extraction for the stock-video downloaders
+"""
+from collections import Counter
+import re
+
+# Words of 4+ letters
+WORD_RE = re.compile(r"[a-zA-Z]{4,}")
+
+# Quotes are dropped in one pass before matching words
+QUOTE_STRIP = str.maketrans("", "", "\"'")
+
+# Expanded stopwords
+STOPWORDS = frozenset({
+    "that", "this", "with", "from", "they", "their", "have", "there",
+    "about", "would", "could", "people", "because", "which", "when",
+    "just", "know", "ever", "those", "thing", "right", "what", "your",
+    "some", "been", "like", "were", "said", "each", "them", "than",
+    "many", "more", "make", "made", "then", "into", "only", "other",
+    "also", "these", "tell", "gets", "gives", "kind", "happen", "youll",
+    "youre", "never", "believe"
+})
+
+# Topic-relevant defaults used when the script yields too few keywords
+TOPIC_WORDS = ("lifestyle", "moment", "people", "daily", "experience")
+
+
+def extract_keywords(text: str, max_words=6, defaults=TOPIC_WORDS):
+    """Extract relevant keywords from script text
+
+    Returns the most common 4+ letter words that aren't stopwords, topped up
+    from `defaults` (pass () to skip that) if there are fewer than max_words.
+    """
+    # Remove quotes, then count the meaningful 4+ letter words straight off
+    # the match iterator - no intermediate list of every word
+    lowered = text.translate(QUOTE_STRIP).lower()
+    common = Counter(
+        w for w in (m.group(0) for m in WORD_RE.finditer(lowered))
+        if w not in STOPWORDS
+    )
+
+    # Take just the top max_words
+    keywords = [w for w, _ in common.most_common(max_words)]
+
+    # If not enough keywords, add topic-relevant defaults
+    for word in defaults:
+        if len(keywords) >= max_words:
+            break
+        if word not in keywords:
+            keywords.append(word)
+
+    return keywords
@@ -1,44 +1,25 @@
 ﻿from pathlib import Path
-import subprocess
 import wave
 import contextlib
 import sys
-import yaml
+
+from _ffmpeg_utils import find_ffmpeg, load_config, get_platform_size, probe_duration, pick_encoder, run_ffmpeg
 
 BASE_DIR = Path(__file__).resolve().parent.parent
 VIDEO_DIR = BASE_DIR / "videos"
 OUTPUT_DIR = BASE_DIR / "output"
-CONFIG_PATH = BASE_DIR / "config" / "settings.yaml"
 
 AUDIO = OUTPUT_DIR / "voice.wav"
 ASS_FILE = OUTPUT_DIR / "captions.ass"
 FINAL_VIDEO = OUTPUT_DIR / "final.mp4"
 
 
-def load_config():
-    """Load settings from YAML config"""
-    # Check for job-specific config first
-    job_config = OUTPUT_DIR / "settings.yaml"
-    config_path = job_config if job_config.exists() else CONFIG_PATH
-    with open(config_path, "r", encoding="utf-8") as f:
-        return yaml.safe_load(f)
-
-
 def get_audio_duration(audio_file):
     """Get duration of audio file"""
     # Use ffmpeg to get accurate duration
-    try:
-        ffmpeg = find_ffmpeg()
-        cmd = [ffmpeg, "-i", str(audio_file), "-f", "null", "-"]
-        result = subprocess.run(cmd, capture_output=True, text=True)
-        output = result.stderr + result.stdout
-        for line in output.split('\n'):
-            if 'Duration:' in line:
-                time_str = line.split('Duration:')[1].split(',')[0].strip()
-                h, m, s = time_str.split(':')
-                return float(h) * 3600 + float(m) * 60 + float(s)
-    except:
-        pass
+    duration = probe_duration(audio_file)
+    if duration is not None:
+        return duration
     
     # Fallback: try reading as WAV
     try:
@@ -54,32 +35,6 @@ def get_audio_duration(audio_file):
     return file_size / 88000
 
 
-def find_ffmpeg():
-    """Find ffmpeg executable"""
-    possible_paths = [
-        "ffmpeg",
-        r"C:\Users\Walt\Downloads\ffmpeg\ffmpeg-master-latest-win64-gpl\bin\ffmpeg.exe",
-        r"C:\ffmpeg\bin\ffmpeg.exe",
-        r"C:\Program Files\ffmpeg\bin\ffmpeg.exe",
-        r"C:\Program Files (x86)\ffmpeg\bin\ffmpeg.exe",
-        r"C:\Program Files (x86)\HitPaw\HitPaw Watermark Remover\ffmpeg.exe",
-    ]
-    
-    for path in possible_paths:
-        try:
-            result = subprocess.run([path, "-version"], capture_output=True, timeout=2)
-            if result.returncode != 0:
-                continue
-            return path
-        except:
-            continue
-    
-    raise FileNotFoundError(
-        "ffmpeg not found! Please add ffmpeg to your PATH or install it.\n"
-        "Download from: https://ffmpeg.org/download.html"
-    )
-
-
 def main():
     # Get platform from command line argument
     platform = sys.argv[1] if len(sys.argv) > 1 else "tiktok"
@@ -87,10 +42,7 @@ def main():
 
     # Load config and platform specs
     config = load_config()
-    platforms = config.get("platforms", {})
-    platform_spec = platforms.get(platform, platforms.get("tiktok"))
-    width = platform_spec.get("width", 1080)
-    height = platform_spec.get("height", 1920)
+    width, height = get_platform_size(config, platform)
     
     # Get caption style from config
     caption_style = config.get("video", {}).get("caption_style", "bounce")
@@ -245,9 +197,7 @@ def main():
         cmd.extend(["-map", f"{audio_index}:a"])
     
     cmd.extend([
-        "-c:v", "libx264",
-        "-preset", "medium",
-        "-crf", "23",
+        *pick_encoder(),
         "-pix_fmt", "yuv420p",
     ])
     
@@ -256,13 +206,12 @@ def main():
     
     cmd.extend(["-t", str(target_duration), "temp_video.mp4"])
 
-    result = subprocess.run(cmd, capture_output=True, text=True)
+    result = run_ffmpeg(cmd)
     if result.returncode != 0:
         print(f"FFmpeg error: {result.stderr}")
         raise RuntimeError("FFmpeg rendering failed")
 
     # Check if end card is enabled - TEMPORARILY DISABLED FOR DEBUGGING
-    config = load_config()
     end_card_enabled = False  # config.get("branding", {}).get("end_card", {}).get("enabled", True)
     end_card_path = BASE_DIR / config.get("branding", {}).get("end_card", {}).get("image_path", "images/echo_endcard.png")
     end_card_duration = config.get("branding", {}).get("end_card", {}).get("duration", 3)
@@ -277,13 +226,11 @@ def main():
             "-i", str(end_card_path.absolute()),
             "-t", str(end_card_duration),
             "-vf", f"scale={width}:{height}:force_original_aspect_ratio=decrease,pad={width}:{height}:(ow-iw)/2:(oh-ih)/2:black",
-            "-c:v", "libx264",
-            "-preset", "medium",
-            "-crf", "23",
+            *pick_encoder(),  # Same encoder as the main video so concat can copy
             "-pix_fmt", "yuv420p",
             "temp_endcard.mp4"
         ]
-        result = subprocess.run(end_card_cmd, capture_output=True, text=True)
+        result = run_ffmpeg(end_card_cmd)
         print(f"✅ FIXED CLIPS ENDCARD ERROR HANDLING - Debug: Endcard FFmpeg return code: {result.returncode}")
         print(f"Debug: Endcard FFmpeg stderr length: {len(result.stderr) if result.stderr else 0}")
         
@@ -308,7 +255,7 @@ def main():
             "final.mp4"
         ]
         print(f"Debug: Running concat command: {' '.join(concat_cmd)}")
-        result = subprocess.run(concat_cmd, capture_output=True, text=True)
+        result = run_ffmpeg(concat_cmd)
         print(f"Debug: Concat return code: {result.returncode}")
         print(f"Debug: Concat stderr: {result.stderr[:500] if result.stderr else 'None'}")
         if result.returncode != 0:
@@ -1,54 +1,89 @@
 ﻿"""
 Render TikTok video mixing video clips and still images with logo overlay
 """
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 import subprocess
+import tempfile
+import itertools
+import math
 from pathlib import Path
-import yaml
 import sys
-import shutil
+import os
+import uuid
+
+try:
+    # Optional: render Ken Burns stills in-process instead of via zoompan
+    import av
+    from PIL import Image
+except ImportError:
+    av = None
+    Image = None
+
+from _ffmpeg_utils import (
+    find_ffmpeg, load_config, get_platform_size, probe_duration,
+    probe_video_infos, matches_spec, scaled_logo, hwaccel_args, pick_encoder,
+    run_ffmpeg,
+)
 
 BASE_DIR = Path(__file__).resolve().parent.parent
 OUTPUT_DIR = BASE_DIR / "output"
 IMG_DIR = BASE_DIR / "images"
 VIDEO_DIR = BASE_DIR / "videos"
-CONFIG_PATH = BASE_DIR / "config" / "settings.yaml"
 
-def find_ffmpeg():
-    """Find ffmpeg executable"""
-    paths = [
-        "ffmpeg",
-        r"C:\Users\Walt\Downloads\ffmpeg\ffmpeg-master-latest-win64-gpl\bin\ffmpeg.exe",
-        r"C:\ffmpeg\bin\ffmpeg.exe",
-        r"C:\Program Files\ffmpeg\bin\ffmpeg.exe",
-        r"C:\Program Files (x86)\ffmpeg\bin\ffmpeg.exe",
-        r"C:\Program Files (x86)\HitPaw\HitPaw Watermark Remover\ffmpeg.exe",
-    ]
-    
-    for path in paths:
-        if shutil.which(path):
-            return path
-    
-    print(
-        " ffmpeg not found! Please add ffmpeg to your PATH or install it.\n"
-        "Download from: https://ffmpeg.org/download.html"
-    )
-    sys.exit(1)
+def render_kenburns_segment(image_path, out_path, duration, width, height, fps=30):
+    """Render a Ken Burns zoom of a still in-process with PyAV + Pillow
 
-def load_config():
-    """Load settings from YAML config"""
-    with open(CONFIG_PATH, "r", encoding="utf-8") as f:
-        return yaml.safe_load(f)
+    Same motion as the zoompan chain (fit + pad into the frame, then zoom in
+    0.0015 per frame up to 1.5x around the center), encoded with the
+    intermediate settings so it joins the other segments. Returns a
+    CompletedProcess so callers can treat it like an ffmpeg run.
+    """
+    try:
+        # Fit the image inside the frame on a black canvas (scale + pad)
+        canvas = Image.new("RGB", (width, height), "black")
+        with Image.open(image_path) as img:
+            img = img.convert("RGB")
+            scale = min(width / img.width, height / img.height)
+            fitted = img.resize((max(1, round(img.width * scale)), max(1, round(img.height * scale))), Image.LANCZOS)
+        canvas.paste(fitted, ((width - fitted.width) // 2, (height - fitted.height) // 2))
+        
+        with av.open(str(out_path), mode="w") as container:
+            stream = container.add_stream("libx264", rate=fps)
+            stream.width = width
+            stream.height = height
+            stream.pix_fmt = "yuv420p"
+            stream.options = {"preset": "ultrafast", "crf": "18", "g": "30", "keyint_min": "30"}
+            
+            for f in range(int(duration * fps)):
+                zoom = min(1 + 0.0015 * (f + 1), 1.5)
+                crop_w = width / zoom
+                crop_h = height / zoom
+                x0 = (width - crop_w) / 2
+                y0 = (height - crop_h) / 2
+                frame_img = canvas.resize((width, height), Image.LANCZOS, box=(x0, y0, x0 + crop_w, y0 + crop_h))
+                container.mux(stream.encode(av.VideoFrame.from_image(frame_img)))
+            container.mux(stream.encode())  # Flush
+    except Exception as e:
+        return subprocess.CompletedProcess([str(image_path)], 1, "", f"Ken Burns render failed: {e}")
+    return subprocess.CompletedProcess([str(image_path)], 0, "", "")
+
+def run_with_fallback(job, fallback):
+    """Run a segment job, and the fallback job only if the first one fails"""
+    result = job()
+    if result.returncode == 0:
+        return result
+    print(f"   {result.stderr.strip()} - retrying with ffmpeg")
+    return fallback()
 
 def render_combo_video(platform="tiktok"):
     """Render video mixing video clips and still images with logo overlay"""
     config = load_config()
+    ffmpeg = find_ffmpeg()
     branding = config.get("branding", {})
     
     # Get platform specs
-    platforms = config.get("platforms", {})
-    platform_spec = platforms.get(platform, platforms.get("tiktok"))
-    video_width = platform_spec.get("width", 1080)
-    video_height = platform_spec.get("height", 1920)
+    video_width, video_height = get_platform_size(config, platform)
     
     # Get caption style from config
     caption_style = config.get("video", {}).get("caption_style", "bounce")
@@ -69,16 +104,8 @@ def render_combo_video(platform="tiktok"):
     output_file = OUTPUT_DIR / "final.mp4"
     
     # Calculate number of segments based on audio length
-    import subprocess as sp
-    result = sp.run([find_ffmpeg(), "-i", str(audio_file)], 
-                    capture_output=True, text=True)
-    duration_line = [line for line in result.stderr.split('\n') if 'Duration:' in line]
-    if duration_line:
-        # Parse duration: "Duration: 00:00:53.16"
-        duration_str = duration_line[0].split('Duration: ')[1].split(',')[0]
-        h, m, s = duration_str.split(':')
-        audio_duration = int(h) * 3600 + int(m) * 60 + float(s)
-    else:
+    audio_duration = probe_duration(audio_file)
+    if audio_duration is None:
         audio_duration = 53.16  # Default fallback
     
     # Calculate number of segments (aim for 8-10 seconds per segment)
@@ -89,26 +116,6 @@ def render_combo_video(platform="tiktok"):
     available_videos = sorted(VIDEO_DIR.glob("video_*.mp4"))
     available_images = sorted(IMG_DIR.glob("img_*.jpg"))
     
-    # Calculate actual total time we need to fill
-    # First, check the actual video durations
-    import subprocess as sp
-    video_durations = []
-    for vid in available_videos[:6]:  # Check up to 6 videos
-        try:
-            result = sp.run([find_ffmpeg(), "-i", str(vid)], 
-                          capture_output=True, text=True)
-            duration_line = [line for line in result.stderr.split('\n') if 'Duration:' in line]
-            if duration_line:
-                duration_str = duration_line[0].split('Duration: ')[1].split(',')[0]
-                h, m, s = duration_str.split(':')
-                vid_duration = int(h) * 3600 + int(m) * 60 + float(s)
-                video_durations.append(vid_duration)
-        except:
-            pass
-    
-    # Adjust segment count based on actual video availability
-    # If videos average less than target, we need more segments
-    avg_video_duration = sum(video_durations) / len(video_durations) if video_durations else target_segment_duration
     segment_duration = target_segment_duration  # Images will be this long
     
     # Calculate how many segments we need to fill the audio duration
@@ -119,17 +126,33 @@ def render_combo_video(platform="tiktok"):
     max_videos_to_use = min(len(available_videos), 25)  # Use all videos up to 25
     max_images_to_use = min(len(available_images), 30)  # Use all images up to 30
     
-    # Calculate expected total time if we use all available media once
-    expected_video_time = sum(video_durations[:max_videos_to_use]) if video_durations else (max_videos_to_use * avg_video_duration)
-    expected_image_time = max_images_to_use * segment_duration
-    expected_total = expected_video_time + expected_image_time
+    # Walk the media in the order it's rendered (V, I, V, I, ...) until it
+    # covers the audio, keeping at least two of each. Clips are probed a
+    # small concurrent batch at a time as the walk reaches them, so clips
+    # past the ones we need are never probed
+    min_videos = min(2, max_videos_to_use)
+    min_images = min(2, max_images_to_use)
+    video_durations = []
+    expected_total = 0.0
+    num_videos = num_images = 0
+    while ((expected_total < audio_duration or num_videos < min_videos or num_images < min_images)
+           and (num_videos < max_videos_to_use or num_images < max_images_to_use)):
+        if num_videos < max_videos_to_use and (expected_total < audio_duration or num_videos < min_videos):
+            if num_videos == len(video_durations):
+                batch = available_videos[num_videos:min(num_videos + 4, max_videos_to_use)]
+                video_durations.extend(
+                    (info or {}).get("duration") or segment_duration
+                    for info in probe_video_infos(batch)
+                )
+            expected_total += video_durations[num_videos]
+            num_videos += 1
+        if num_images < max_images_to_use and (expected_total < audio_duration or num_images < min_images):
+            expected_total += segment_duration
+            num_images += 1
     
     # Determine how many media files we actually need
     if expected_total >= audio_duration:
-        # We have enough content - just trim to fit
-        ratio = audio_duration / expected_total
-        num_videos = max(2, int(max_videos_to_use * ratio))
-        num_images = max(2, int(max_images_to_use * ratio))
+        # We have enough content - use just the media the walk picked
         video_files = available_videos[:num_videos]
         image_files = available_images[:num_images]
     else:
@@ -137,47 +160,19 @@ def render_combo_video(platform="tiktok"):
         print(f"   ⚠️ Only {expected_total:.1f}s of content for {audio_duration:.1f}s audio")
         print(f"   🔄 Will loop media files to fill duration")
         
-        # Use all available media and calculate how many times to repeat
+        # Use all available media
         base_video_files = list(available_videos[:max_videos_to_use])
         base_image_files = list(available_images[:max_images_to_use])
         
-        # Calculate how many loops we need
-        if expected_total > 0:
-            loops_needed = int(audio_duration / expected_total) + 1
-        else:
-            loops_needed = 2
-        
-        # Repeat the media files to fill the duration
-        video_files = base_video_files * loops_needed
-        image_files = base_image_files * loops_needed
-        
-        # Trim to approximately match audio duration
-        # Alternate V-I-V-I pattern and stop when we exceed audio duration
-        estimated_time = 0
-        final_video_files = []
-        final_image_files = []
-        v_idx = 0
-        i_idx = 0
+        # Closed form: each V-I pair covers the mean clip length plus one
+        # still, so the pair count follows directly from the audio duration
+        mean_video = sum(video_durations) / len(video_durations) if video_durations else 0
+        pair_duration = mean_video + (segment_duration if base_image_files else 0)
+        num_pairs = math.ceil(audio_duration / pair_duration) if pair_duration > 0 else 0
         
-        while estimated_time < audio_duration and (v_idx < len(video_files) or i_idx < len(image_files)):
-            # Add video
-            if v_idx < len(video_files):
-                final_video_files.append(video_files[v_idx])
-                vid_dur = video_durations[v_idx % len(video_durations)] if video_durations else avg_video_duration
-                estimated_time += vid_dur
-                v_idx += 1
-            
-            if estimated_time >= audio_duration:
-                break
-                
-            # Add image
-            if i_idx < len(image_files):
-                final_image_files.append(image_files[i_idx])
-                estimated_time += segment_duration
-                i_idx += 1
+        video_files = list(itertools.islice(itertools.cycle(base_video_files), num_pairs))
+        image_files = list(itertools.islice(itertools.cycle(base_image_files), num_pairs))
         
-        video_files = final_video_files
-        image_files = final_image_files
         num_videos = len(video_files)
         num_images = len(image_files)
     
@@ -192,63 +187,120 @@ def render_combo_video(platform="tiktok"):
     print(f"     {len(image_files)} still images (~{segment_duration:.1f}s each)")
     print(f"    Logo overlay (no gradient bars)")
     
-    # Build ffmpeg inputs - alternate between videos and images
-    inputs = []
+    # Order media - alternate: video, image, video, image, video, image
     all_media = []
-    
-    # Alternate: video, image, video, image, video, image
     for i in range(max(len(video_files), len(image_files))):
         if i < len(video_files):
-            inputs.extend(["-i", str(video_files[i])])
-            all_media.append(("video", len(all_media)))
+            all_media.append(("video", video_files[i]))
         
         if i < len(image_files):
-            # Just add image input (no -loop flag, we'll handle it in filter)
-            inputs.extend(["-i", str(image_files[i])])
-            all_media.append(("image", len(all_media)))
+            all_media.append(("image", image_files[i]))
     
-    # Add audio
-    inputs.extend(["-i", str(audio_file)])
-    audio_index = len(all_media)  # Audio is after all media files
-    
-    # Build filter complex
-    filter_parts = []
-    
-    # Process each media file (normalize and prepare)
     # Calculate zoompan duration in frames (segment_duration * fps)
     zoompan_frames = int(segment_duration * 30)
     
-    for idx, (media_type, _) in enumerate(all_media):
+    # Every temp file of this render carries a unique tag, so several renders
+    # (e.g. one per platform) can run at once in the same output folder
+    run_tag = f"{platform}_{uuid.uuid4().hex[:8]}"
+    
+    # Clips that are already H.264 at the target size/fps skip the
+    # fps/scale/pad chain. They're only stream-copied if every segment is such
+    # a clip: the concat demuxer decodes the whole list with the first file's
+    # SPS/PPS, so next to encoded stills they're re-encoded with the same
+    # intermediate settings instead
+    unique_videos = list(dict.fromkeys(video_files))
+    video_infos = dict(zip(unique_videos, probe_video_infos(unique_videos)))
+    copy_segments = all(
+        media_type == "video" and matches_spec(video_infos.get(media_file), video_width, video_height)
+        for media_type, media_file in all_media
+    )
+    
+    # Build one render job per segment. Every segment is normalized to the
+    # same size/fps/codec so the concat demuxer can join them without re-encoding
+    segment_files = []
+    segment_jobs = []
+    for idx, (media_type, media_file) in enumerate(all_media):
+        segment_file = OUTPUT_DIR / f"seg_{run_tag}_{idx:02d}.mp4"
+        segment_files.append(segment_file)
+        
+        if copy_segments:
+            segment_jobs.append(partial(run_ffmpeg, [
+                ffmpeg, "-y", "-nostdin",
+                "-i", str(media_file),
+                "-map", "0:v:0", "-an",
+                "-c:v", "copy",
+                str(segment_file)
+            ]))
+            continue
+        
         if media_type == "image":
             # Convert image to video with Ken Burns zoom effect
-            # Use loop filter to repeat the image, then zoompan for Ken Burns effect
-            # Add trim and setpts to ensure proper timing for concat
-            filter_parts.append(
-                f"[{idx}:v]loop=loop=-1:size=1:start=0,"
+            # The image is decoded once as a single frame; zoompan emits
+            # exactly d frames from it, so no loop/trim is needed for timing
+            video_filter = (
                 f"scale={video_width}:{video_height}:"
                 f"force_original_aspect_ratio=decrease,"
                 f"pad={video_width}:{video_height}:(ow-iw)/2:(oh-ih)/2:black,"
                 f"setsar=1,"
-                f"zoompan=z='min(zoom+0.0015,1.5)':d={zoompan_frames}:fps=30:x='iw/2-(iw/zoom/2)':y='ih/2-(ih/zoom/2)':s={video_width}x{video_height},"
-                f"trim=duration={segment_duration},setpts=PTS-STARTPTS[v{idx}];"
+                f"zoompan=z='min(zoom+0.0015,1.5)':d={zoompan_frames}:fps=30:x='iw/2-(iw/zoom/2)':y='ih/2-(ih/zoom/2)':s={video_width}x{video_height}"
             )
+        elif matches_spec(video_infos.get(media_file), video_width, video_height):
+            # Already the right size/fps - only reset timestamps
+            video_filter = "setpts=PTS-STARTPTS"
         else:
             # Process video - use natural duration, just normalize format for concat
-            filter_parts.append(
-                f"[{idx}:v]scale={video_width}:{video_height}:"
+            # fps runs first so frames it drops never reach the scaler
+            video_filter = (
+                f"fps=30,scale={video_width}:{video_height}:"
                 f"force_original_aspect_ratio=decrease,"
                 f"pad={video_width}:{video_height}:(ow-iw)/2:(oh-ih)/2:black,"
-                f"setsar=1,fps=30,setpts=PTS-STARTPTS[v{idx}];"
+                f"setsar=1,setpts=PTS-STARTPTS"
             )
+        
+        ffmpeg_job = partial(run_ffmpeg, [
+            ffmpeg, "-y", "-nostdin",
+            "-i", str(media_file),
+            "-vf", video_filter,
+            "-an",
+            *pick_encoder(intermediate=True),
+            "-pix_fmt", "yuv420p",
+            str(segment_file)
+        ])
+        
+        if media_type == "image" and av is not None:
+            # PyAV + Pillow available - skip the zoompan filter, keeping the
+            # ffmpeg command in case the in-process render fails
+            segment_jobs.append(partial(run_with_fallback, partial(
+                render_kenburns_segment, media_file, segment_file,
+                segment_duration, video_width, video_height
+            ), ffmpeg_job))
+        else:
+            segment_jobs.append(ffmpeg_job)
+    
+    # Segments sit next to the list file, so plain names are enough
+    segment_list = OUTPUT_DIR / f"segments_{run_tag}.txt"
+    segment_list.write_text("".join(f"file '{f.name}'\n" for f in segment_files), encoding="utf-8")
     
-    # Concatenate all media clips
-    concat_input = "".join([f"[v{i}]" for i in range(len(all_media))])
-    filter_parts.append(f"{concat_input}concat=n={len(all_media)}:v=1:a=0[base];")
+    # Final pass: burn captions (captions.ass goes straight to libass) onto the
+    # joined segments, then put the logo on top as the single overlay.
+    # ffmpeg runs from the captions' folder, so the filter only needs the
+    # bare file name - no drive-letter/backslash escaping in the graph
+    captions_str = captions_file.name
     
-    filter_complex = "".join(filter_parts)
+    # Collect filter chains and join them once at the end
+    filter_parts = []
+    
+    # Inputs: 0 = joined segments, 1 = audio, 2 = logo (if enabled)
+    inputs = [
+        *hwaccel_args(),
+        "-f", "concat", "-safe", "0", "-i", str(segment_list),
+        "-i", str(audio_file),
+    ]
     
     # Add logo overlay if enabled
     if logo_enabled:
+        filter_parts.append(f"[0:v]ass={captions_str}[captioned]")
+        
         # Calculate logo position
         if logo_position == "top_right":
             logo_x = video_width - logo_width - logo_padding
@@ -266,52 +318,56 @@ def render_combo_video(platform="tiktok"):
             logo_x = video_width - logo_width - logo_padding
             logo_y = logo_padding
         
-        logo_path_str = str(logo_path).replace("\\", "\\\\\\\\").replace(":", "\\\\:")
-        filter_complex += f"movie={logo_path_str},scale={logo_width}:-1,loop=loop=-1:size=1[logo];"
-        filter_complex += f"[base][logo]overlay={logo_x}:{logo_y}[with_logo];"
-        base_tag = "[with_logo]"
+        # Feed the logo as a looped still input - the image demuxer repeats
+        # it for free. Use the pre-scaled copy from the cache, and scale in
+        # the graph only if that copy couldn't be made
+        cached_logo = scaled_logo(logo_path, logo_width)
+        inputs.extend(["-loop", "1", "-i", str(cached_logo or logo_path)])
+        if cached_logo:
+            logo_tag = "[2:v]"
+        else:
+            filter_parts.append(f"[2:v]scale={logo_width}:-1[logo]")
+            logo_tag = "[logo]"
+        filter_parts.append(f"[captioned]{logo_tag}overlay={logo_x}:{logo_y}:shortest=1[out]")
     else:
-        base_tag = "[base]"
+        filter_parts.append(f"[0:v]ass={captions_str}[out]")
     
-    # Add captions
-    captions_str = str(captions_file).replace("\\", "\\\\\\\\").replace(":", "\\\\:")
-    filter_complex += f"{base_tag}subtitles=filename={captions_str}[out]"
+    filter_complex = ";".join(filter_parts)
     
-    # Save filter to file
-    filter_file = BASE_DIR / "filter_complex.txt"
-    filter_file.write_text(filter_complex, encoding="utf-8")
+    # Save filter to a uniquely named file - removed in the finally below
+    with tempfile.NamedTemporaryFile("w", suffix=".txt", prefix="filter_complex_",
+                                     dir=OUTPUT_DIR, delete=False, encoding="utf-8") as fh:
+        fh.write(filter_complex)
+        filter_file = Path(fh.name)
     
     # FFmpeg command
-    ffmpeg = find_ffmpeg()
-    temp_output = BASE_DIR / "output" / "temp_video.mp4"
+    temp_output = OUTPUT_DIR / f"temp_video_{run_tag}.mp4"
     cmd = [
         ffmpeg, "-y", "-nostdin",
         *inputs,
         "-filter_complex_script", str(filter_file),
         "-map", "[out]",
-        "-map", f"{audio_index}:a",
-        "-c:v", "libx264", "-preset", "medium", "-crf", "23",
+        "-map", "1:a",
+        *pick_encoder(),
         "-c:a", "aac", "-b:a", "128k",
         "-shortest",  # Stop when shortest stream (audio) ends
         str(temp_output)
     ]
     
+    # Check if end card is enabled - TEMPORARILY DISABLED FOR DEBUGGING
+    end_card_enabled = False  # config.get("branding", {}).get("end_card", {}).get("enabled", True)
+    end_card_path = BASE_DIR / config.get("branding", {}).get("end_card", {}).get("image_path", "images/echo_endcard.png")
+    end_card_duration = config.get("branding", {}).get("end_card", {}).get("duration", 3)
+    temp_endcard = OUTPUT_DIR / f"temp_endcard_{run_tag}.mp4"
+    concat_list = OUTPUT_DIR / f"concat_list_{run_tag}.txt"
+    
+    # The end card doesn't depend on the main render, so it's encoded in the
+    # background while the segments and final pass run
+    end_card_pool = ThreadPoolExecutor(max_workers=1)
+    end_card_future = None
+    
     try:
-        result = subprocess.run(cmd, capture_output=True, text=True)
-        if result.returncode != 0:
-            print(f" FFmpeg error: {result.stderr}")
-            return False
-        filter_file.unlink()
-        
-        # Check if end card is enabled - TEMPORARILY DISABLED FOR DEBUGGING
-        config = load_config()
-        end_card_enabled = False  # config.get("branding", {}).get("end_card", {}).get("enabled", True)
-        end_card_path = BASE_DIR / config.get("branding", {}).get("end_card", {}).get("image_path", "images/echo_endcard.png")
-        end_card_duration = config.get("branding", {}).get("end_card", {}).get("duration", 3)
-        
         if end_card_enabled and end_card_path.exists():
-            print(f" Adding {end_card_duration}s end card...")
-            
             # Create end card video segment
             end_card_cmd = [
                 ffmpeg, "-y", "-nostdin",
@@ -319,13 +375,33 @@ def render_combo_video(platform="tiktok"):
                 "-i", str(end_card_path.absolute()),
                 "-t", str(end_card_duration),
                 "-vf", f"scale={video_width}:{video_height}:force_original_aspect_ratio=decrease,pad={video_width}:{video_height}:(ow-iw)/2:(oh-ih)/2:black",
-                "-c:v", "libx264",
-                "-preset", "medium",
-                "-crf", "23",
+                *pick_encoder(),  # Same encoder as the main video so concat can copy
                 "-pix_fmt", "yuv420p",
-                str(BASE_DIR / "output" / "temp_endcard.mp4")
+                str(temp_endcard)
             ]
-            result = subprocess.run(end_card_cmd, capture_output=True, text=True)
+            end_card_future = end_card_pool.submit(run_ffmpeg, end_card_cmd)
+        
+        # Segments are independent, so render them side by side. Each ffmpeg
+        # is its own process already - threads just wait on them
+        workers = max(1, (os.cpu_count() or 2) // 2)
+        print(f"   Rendering {len(segment_jobs)} segments ({workers} at a time)...")
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            segment_results = list(pool.map(lambda job: job(), segment_jobs))
+        for result in segment_results:
+            if result.returncode != 0:
+                print(f" FFmpeg segment error: {result.stderr}")
+                return False
+        
+        result = run_ffmpeg(cmd, cwd=captions_file.parent)
+        if result.returncode != 0:
+            print(f" FFmpeg error: {result.stderr}")
+            return False
+        
+        if end_card_future is not None:
+            print(f" Adding {end_card_duration}s end card...")
+            
+            # The end card was rendering alongside the main video - collect it
+            result = end_card_future.result()
             print(f"🔥 FIXED COMBO ENDCARD ERROR HANDLING - Return code: {result.returncode}")
             print(f"Stderr length: {len(result.stderr) if result.stderr else 0}")
             
@@ -337,10 +413,9 @@ def render_combo_video(platform="tiktok"):
                 print(f"✅ Combo endcard created successfully (code {result.returncode}). Stderr is normal FFmpeg progress.")
             
             # Concatenate main video with end card
-            concat_list = BASE_DIR / "output" / "concat_list.txt"
             with open(concat_list, "w") as f:
-                f.write(f"file 'temp_video.mp4'\n")
-                f.write(f"file 'temp_endcard.mp4'\n")
+                f.write(f"file '{temp_output.name}'\n")
+                f.write(f"file '{temp_endcard.name}'\n")
             
             concat_cmd = [
                 ffmpeg, "-y", "-nostdin",
@@ -350,22 +425,15 @@ def render_combo_video(platform="tiktok"):
                 "-c", "copy",
                 str(output_file)
             ]
-            result = subprocess.run(concat_cmd, capture_output=True, text=True)
+            result = run_ffmpeg(concat_cmd)
             if result.returncode != 0:
                 print(f" FFmpeg concat error: {result.stderr}")
                 return False
             
-            # Cleanup temporary files
-            temp_output.unlink(missing_ok=True)
-            (BASE_DIR / "output" / "temp_endcard.mp4").unlink(missing_ok=True)
-            concat_list.unlink(missing_ok=True)
-            
             print(f" Combo video created with end card: {output_file}")
         else:
-            # No end card - just rename temp file to final (replace if exists)
-            if output_file.exists():
-                output_file.unlink()
-            temp_output.rename(output_file)
+            # No end card - just move temp file to final (replace if exists)
+            temp_output.replace(output_file)
             print(f" Combo video created: {output_file}")
         
         print(f"    Videos +  Images +  Logo +  Captions")
@@ -373,6 +441,15 @@ def render_combo_video(platform="tiktok"):
     except Exception as e:
         print(f" FFmpeg error: {e}")
         return False
+    finally:
+        end_card_pool.shutdown(wait=True)
+        filter_file.unlink(missing_ok=True)
+        temp_output.unlink(missing_ok=True)
+        temp_endcard.unlink(missing_ok=True)
+        concat_list.unlink(missing_ok=True)
+        for segment_file in segment_files:
+            segment_file.unlink(missing_ok=True)
+        segment_list.unlink(missing_ok=True)
 
 def main():
     # Get platform from command line argument
@@ -1,27 +1,205 @@
-﻿import re
-import requests
+﻿from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from collections import Counter
+from contextlib import closing
+import threading
+import hashlib
+import os
+import sqlite3
 import random
+import shutil
+import json
 import time
-import yaml
+
+from _keywords import extract_keywords
+from _http import make_session
+from _ffmpeg_utils import load_config
 
 BASE_DIR = Path(__file__).resolve().parent.parent
 OUTPUT_DIR = BASE_DIR / "output"
 VIDEO_DIR = BASE_DIR / "videos"
-CONFIG_PATH = BASE_DIR / "config" / "settings.yaml"
 
 SCRIPT = OUTPUT_DIR / "script.txt"
 
+# Local cache of search responses + downloaded files. The search results
+# are cached, not the pick, so every run still chooses a random clip;
+# a clip that was downloaded before is hardlinked (or copied) instead of
+# fetched again. Entries unused for SEARCH_CACHE_TTL are dropped
+CACHE_DB = OUTPUT_DIR / "cache.sqlite"
+MEDIA_CACHE_DIR = OUTPUT_DIR / ".media_cache"
+SEARCH_CACHE_TTL = 7 * 24 * 3600  # 7 days
+
 VIDEO_DIR.mkdir(exist_ok=True)
 
 # Track Vecteezy downloads (500/month free tier limit)
 VECTEEZY_DOWNLOADS = 0
+_DOWNLOADS_LOCK = threading.Lock()
+
+# (source, resource id) of every clip picked this run, so no two slots
+# end up with the same clip
+_USED_RESOURCES = set()
+_USED_LOCK = threading.Lock()
+
+# Download chunk size - big chunks keep Python out of the hot loop
+CHUNK_SIZE = 1024 * 1024
+
+SESSION = make_session(pool_connections=10, pool_maxsize=20, backoff=0.5)
+
+def _open_cache():
+    """Open the cache database, creating it on first use"""
+    OUTPUT_DIR.mkdir(exist_ok=True)
+    conn = sqlite3.connect(CACHE_DB, timeout=10)
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS search_results ("
+        " source TEXT, keyword TEXT, params_hash TEXT, response_json TEXT, ts REAL,"
+        " PRIMARY KEY (source, keyword, params_hash))"
+    )
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS media_files ("
+        " source TEXT, resource_id TEXT, file_hash TEXT, local_path TEXT, ts REAL,"
+        " PRIMARY KEY (source, resource_id))"
+    )
+    _prune_cache(conn)
+    return conn
+
+_cache_pruned = False
+
+def _prune_cache(conn):
+    """Drop cache entries (and media files) unused for SEARCH_CACHE_TTL
+    
+    Runs once per process, on the first cache open.
+    """
+    global _cache_pruned
+    if _cache_pruned:
+        return
+    _cache_pruned = True
+    
+    cutoff = time.time() - SEARCH_CACHE_TTL
+    try:
+        with conn:
+            expired = conn.execute(
+                "SELECT DISTINCT local_path FROM media_files WHERE ts <= ?", (cutoff,)
+            ).fetchall()
+            conn.execute("DELETE FROM media_files WHERE ts <= ?", (cutoff,))
+            conn.execute("DELETE FROM search_results WHERE ts <= ?", (cutoff,))
+            still_used = {row[0] for row in conn.execute("SELECT local_path FROM media_files")}
+    except sqlite3.Error:
+        return
+    
+    # Also sweep old files no entry points to (e.g. from an interrupted run)
+    stale = {local_path for (local_path,) in expired}
+    if MEDIA_CACHE_DIR.is_dir():
+        for f in MEDIA_CACHE_DIR.iterdir():
+            try:
+                if f.stat().st_mtime <= cutoff:
+                    stale.add(str(f))
+            except OSError:
+                pass
+    for local_path in stale - still_used:
+        Path(local_path).unlink(missing_ok=True)
+
+def _link_or_copy(src, dst):
+    """Hardlink dst to src, copying only where links aren't possible"""
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copyfile(src, dst)
 
-def load_config():
-    """Load settings from YAML config"""
-    with open(CONFIG_PATH, "r", encoding="utf-8") as f:
-        return yaml.safe_load(f)
+def _params_hash(params: dict) -> str:
+    return hashlib.sha1(json.dumps(params, sort_keys=True).encode("utf-8")).hexdigest()
+
+def cached_search(source: str, keyword: str, params: dict):
+    """Return the cached search response for these params, or None"""
+    try:
+        with closing(_open_cache()) as conn:
+            row = conn.execute(
+                "SELECT response_json FROM search_results"
+                " WHERE source = ? AND keyword = ? AND params_hash = ? AND ts > ?",
+                (source, keyword, _params_hash(params), time.time() - SEARCH_CACHE_TTL),
+            ).fetchone()
+    except sqlite3.Error:
+        return None
+    return json.loads(row[0]) if row else None
+
+def store_search(source: str, keyword: str, params: dict, data: dict):
+    """Remember a search response"""
+    try:
+        with closing(_open_cache()) as conn, conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO search_results VALUES (?, ?, ?, ?, ?)",
+                (source, keyword, _params_hash(params), json.dumps(data), time.time()),
+            )
+    except sqlite3.Error as e:
+        print(f"    Could not cache search: {e}")
+
+def pick_unused(source: str, items: list):
+    """Pick a random search result that no other slot has used this run
+    
+    Returns None if every result is already taken.
+    """
+    candidates = list(items)
+    random.shuffle(candidates)
+    with _USED_LOCK:
+        for item in candidates:
+            key = (source, item.get("id"))
+            if key not in _USED_RESOURCES:
+                _USED_RESOURCES.add(key)
+                return item
+    return None
+
+def restore_cached_video(source: str, resource_id, out_path: Path) -> bool:
+    """Copy a previously downloaded copy of this resource into out_path
+    
+    Returns False if it was never downloaded or its file is gone.
+    """
+    try:
+        with closing(_open_cache()) as conn:
+            row = conn.execute(
+                "SELECT local_path FROM media_files WHERE source = ? AND resource_id = ?",
+                (source, str(resource_id)),
+            ).fetchone()
+    except sqlite3.Error:
+        return False
+    
+    if not row or not Path(row[0]).is_file():
+        return False
+    
+    out_path.unlink(missing_ok=True)
+    _link_or_copy(row[0], out_path)
+    
+    # Using a clip keeps it in the cache for another SEARCH_CACHE_TTL
+    try:
+        with closing(_open_cache()) as conn, conn:
+            conn.execute(
+                "UPDATE media_files SET ts = ? WHERE source = ? AND resource_id = ?",
+                (time.time(), source, str(resource_id)),
+            )
+    except sqlite3.Error:
+        pass
+    size_mb = out_path.stat().st_size / (1024 * 1024)
+    print(f"   SOURCE: {source.upper()} (cached) | Size: {size_mb:.1f}MB | ID: {resource_id}")
+    return True
+
+def store_cached_video(source: str, resource_id, out_path: Path):
+    """Keep a copy of a fresh download under its resource id"""
+    try:
+        sha1 = hashlib.sha1()
+        with open(out_path, "rb") as f:
+            for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+                sha1.update(chunk)
+        file_hash = sha1.hexdigest()
+        
+        MEDIA_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        cached = MEDIA_CACHE_DIR / f"{file_hash}{out_path.suffix}"
+        if not cached.exists():
+            _link_or_copy(out_path, cached)
+        
+        with closing(_open_cache()) as conn, conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO media_files VALUES (?, ?, ?, ?, ?)",
+                (source, str(resource_id), file_hash, str(cached), time.time()),
+            )
+    except (OSError, sqlite3.Error) as e:
+        print(f"    Could not cache video: {e}")
 
 # Generic fallback keywords if topic words fail
 FALLBACKS = [
@@ -33,46 +211,10 @@ FALLBACKS = [
     "daily routine"
 ]
 
-def extract_keywords(text: str, max_words=6):
-    # Remove quotes and clean text
-    text = text.replace('"', '').replace("'", '')
-    
-    # Find all words (4+ letters)
-    words = re.findall(r"[a-zA-Z]{4,}", text.lower())
-    common = Counter(words)
-    
-    # Expanded stopwords
-    stopwords = {
-        "that", "this", "with", "from", "they", "their", "have", "there",
-        "about", "would", "could", "people", "because", "which", "when",
-        "just", "know", "ever", "those", "thing", "right", "what", "your",
-        "some", "been", "like", "were", "said", "each", "them", "than",
-        "many", "more", "make", "made", "then", "into", "only", "other",
-        "also", "these", "tell", "gets", "gives", "kind", "happen", "youll",
-        "youre", "never", "believe"
-    }
-    
-    # Extract meaningful keywords
-    keywords = [
-        w for w, _ in common.most_common(20)  # Get top 20 first
-        if w not in stopwords and len(w) >= 4
-    ][:max_words]
-    
-    # If not enough keywords, add topic-relevant defaults
-    if len(keywords) < max_words:
-        topic_words = ["lifestyle", "moment", "people", "daily", "experience"]
-        for word in topic_words:
-            if word not in keywords:
-                keywords.append(word)
-                if len(keywords) >= max_words:
-                    break
-    
-    return keywords[:max_words]
-
 def fetch_video_pexels(keyword: str, out_path: Path) -> bool:
     """Fetch video from Pexels Videos API"""
     try:
-        config = load_config()
+        config = load_config(job_override=False)
         api_key = config.get("pexels", {}).get("api_key", "")
         
         if not api_key:
@@ -88,18 +230,28 @@ def fetch_video_pexels(keyword: str, out_path: Path) -> bool:
             "per_page": 20
         }
         
-        r = requests.get(search_url, headers=headers, params=params, timeout=10)
-        if r.status_code != 200:
-            print(f"    Pexels API returned status {r.status_code}")
-            return False
+        data = cached_search("pexels", keyword, params)
+        if data is None:
+            r = SESSION.get(search_url, headers=headers, params=params, timeout=10)
+            if r.status_code != 200:
+                print(f"    Pexels API returned status {r.status_code}")
+                return False
             
-        data = r.json()
+            data = r.json()
+            store_search("pexels", keyword, params, data)
+        
         if not data.get("videos"):
             print(f"    No videos found for '{keyword}'")
             return False
         
         # Get a random video from results
-        video = random.choice(data["videos"])
+        video = pick_unused("pexels", data["videos"])
+        if video is None:
+            print(f"    No unused videos left for '{keyword}'")
+            return False
+        
+        if restore_cached_video("pexels", video.get("id"), out_path):
+            return True
         
         # Find HD portrait video file (1080x1920 or closest)
         video_files = video.get("video_files", [])
@@ -136,18 +288,21 @@ def fetch_video_pexels(keyword: str, out_path: Path) -> bool:
         print(f"   Downloading {best_file.get('width')}x{best_file.get('height')} video...")
         
         # Download the video
-        vid_response = requests.get(video_url, timeout=30, stream=True)
+        vid_response = SESSION.get(video_url, timeout=30, stream=True)
         
         if vid_response.status_code == 200:
             # Stream download for large files
+            # Unlink first - the old file may be hardlinked into the media cache
+            out_path.unlink(missing_ok=True)
             with open(out_path, 'wb') as f:
-                for chunk in vid_response.iter_content(chunk_size=8192):
+                for chunk in vid_response.iter_content(chunk_size=CHUNK_SIZE):
                     f.write(chunk)
             
             # Check file size (should be at least 100KB)
             if out_path.stat().st_size > 100000:
                 size_mb = out_path.stat().st_size / (1024 * 1024)
                 print(f"   SOURCE: PEXELS | Size: {size_mb:.1f}MB | Video ID: {video.get('id', 'unknown')}")
+                store_cached_video("pexels", video.get("id"), out_path)
                 return True
             else:
                 out_path.unlink()
@@ -166,33 +321,13 @@ def fetch_video_vecteezy(keyword: str, out_path: Path) -> bool:
     global VECTEEZY_DOWNLOADS
     
     try:
-        config = load_config()
+        config = load_config(job_override=False)
         api_key = config.get("vecteezy", {}).get("api_key", "")
         account_id = config.get("vecteezy", {}).get("account_id", "")
         
         if not api_key or not account_id:
             return False
         
-        # Check account quota first
-        quota_url = f"https://api.vecteezy.com/v2/{account_id}/account/info"
-        headers = {"Authorization": f"Bearer {api_key}"}
-        
-        try:
-            quota_r = requests.get(quota_url, headers=headers, timeout=5)
-            if quota_r.status_code == 200:
-                quota_data = quota_r.json()
-                current = quota_data.get("current", {}).get("download", {})
-                used = current.get("call_count", 0)
-                total = current.get("call_limit", 500)
-                remaining = total - used
-                print(f"   Vecteezy quota: {used}/{total} used, {remaining} remaining")
-                
-                if remaining <= 0:
-                    print(f"    Vecteezy quota exceeded! Skipping.")
-                    return False
-        except:
-            pass  # Continue anyway if quota check fails
-        
         # Search for free videos (license='free' ensures TikTok safety)
         search_url = f"https://api.vecteezy.com/v2/{account_id}/resources"
         params = {
@@ -204,25 +339,56 @@ def fetch_video_vecteezy(keyword: str, out_path: Path) -> bool:
             "per_page": 20
         }
         
-        r = requests.get(search_url, headers=headers, params=params, timeout=10)
+        headers = {"Authorization": f"Bearer {api_key}"}
         
-        if r.status_code != 200:
-            return False
+        data = cached_search("vecteezy", keyword, params)
+        if data is None:
+            r = SESSION.get(search_url, headers=headers, params=params, timeout=10)
+            
+            if r.status_code != 200:
+                return False
+            
+            data = r.json()
+            store_search("vecteezy", keyword, params, data)
         
-        data = r.json()
         resources = data.get("resources", [])
         
         if not resources:
             return False
         
         # Get a random resource from results
-        resource = random.choice(resources)
+        resource = pick_unused("vecteezy", resources)
+        if resource is None:
+            return False
         resource_id = resource.get("id")
         resource_title = resource.get("title", "untitled")[:40]
         
         if not resource_id:
             return False
         
+        # A cached download doesn't count against the monthly quota
+        if restore_cached_video("vecteezy", resource_id, out_path):
+            return True
+        
+        # Check account quota before spending a download
+        quota_url = f"https://api.vecteezy.com/v2/{account_id}/account/info"
+        
+        try:
+            quota_r = SESSION.get(quota_url, headers=headers, timeout=5)
+            if quota_r.status_code == 200:
+                quota_data = quota_r.json()
+                current = quota_data.get("current", {}).get("download", {})
+                used = current.get("call_count", 0)
+                total = current.get("call_limit", 500)
+                remaining = total - used
+                print(f"   Vecteezy quota: {used}/{total} used, {remaining} remaining")
+                
+                if remaining <= 0:
+                    print(f"    Vecteezy quota exceeded! Skipping.")
+                    return False
+        except:
+            pass  # Continue anyway if quota check fails
+        
         # Get download URL
         download_url = f"https://api.vecteezy.com/v2/{account_id}/resources/{resource_id}/download"
         download_params = {
@@ -230,7 +396,7 @@ def fetch_video_vecteezy(keyword: str, out_path: Path) -> bool:
             "file_type": "mp4"
         }
         
-        r = requests.get(download_url, headers=headers, params=download_params, timeout=15)
+        r = SESSION.get(download_url, headers=headers, params=download_params, timeout=15)
         if r.status_code != 200:
             return False
         
@@ -241,18 +407,22 @@ def fetch_video_vecteezy(keyword: str, out_path: Path) -> bool:
             return False
         
         # Download the video
-        video_response = requests.get(video_url, timeout=30, stream=True)
+        video_response = SESSION.get(video_url, timeout=30, stream=True)
         
         if video_response.status_code == 200:
             # Stream download for large video files
+            # Unlink first - the old file may be hardlinked into the media cache
+            out_path.unlink(missing_ok=True)
             with open(out_path, 'wb') as f:
-                for chunk in video_response.iter_content(chunk_size=8192):
+                for chunk in video_response.iter_content(chunk_size=CHUNK_SIZE):
                     f.write(chunk)
             
             if out_path.stat().st_size > 50000:  # At least 50KB
-                VECTEEZY_DOWNLOADS += 1
+                with _DOWNLOADS_LOCK:
+                    VECTEEZY_DOWNLOADS += 1
                 size_mb = out_path.stat().st_size / (1024 * 1024)
                 print(f"   SOURCE: VECTEEZY | Size: {size_mb:.1f}MB | Resource: {resource_title} (ID: {resource_id})")
+                store_cached_video("vecteezy", resource_id, out_path)
                 return True
             else:
                 out_path.unlink(missing_ok=True)
@@ -263,6 +433,28 @@ def fetch_video_vecteezy(keyword: str, out_path: Path) -> bool:
     
     return False
 
+def fetch_video_for_keyword(kw: str, out_path: Path) -> bool:
+    """Fetch one video for a keyword: Vecteezy, then Pexels, then a fallback keyword"""
+    print(f"\n Searching video: '{kw}'")
+    
+    # Try Vecteezy first (license-safe videos)
+    if fetch_video_vecteezy(kw, out_path):
+        return True
+    
+    # Try Pexels as fallback
+    print(f"   Trying Pexels fallback")
+    if fetch_video_pexels(kw, out_path):
+        return True
+    
+    # Try fallback keyword with Pexels
+    fallback = random.choice(FALLBACKS)
+    print(f"   Trying fallback keyword: '{fallback}'")
+    if fetch_video_pexels(fallback, out_path):
+        return True
+    
+    print(f"   Failed to download video for '{kw}'")
+    return False
+
 def main():
     if not SCRIPT.exists():
         raise FileNotFoundError("script.txt not found")
@@ -281,55 +473,28 @@ def main():
 
     VIDEO_DIR.mkdir(exist_ok=True)
 
-    video_index = 1
     max_videos = 6
     
-    for kw in keywords:
-        if video_index > max_videos:
-            break
-            
-        print(f"\n Searching video: '{kw}'")
-        
-        out_path = VIDEO_DIR / f"video_{video_index:02d}.mp4"
-        success = False
-        
-        # Try Vecteezy first (license-safe videos)
-        if fetch_video_vecteezy(kw, out_path):
-            success = True
-        
-        # Try Pexels as fallback
-        if not success:
-            print(f"   Trying Pexels fallback")
-            if fetch_video_pexels(kw, out_path):
-                success = True
-        
-        # Try fallback keyword with Pexels
-        if not success:
-            fallback = random.choice(FALLBACKS)
-            print(f"   Trying fallback keyword: '{fallback}'")
-            if fetch_video_pexels(fallback, out_path):
-                success = True
-        
-        if success:
-            video_index += 1
-        else:
-            print(f"   Failed to download video for '{kw}'")
-        
-        time.sleep(1)  # Rate limiting (videos are larger)
+    # Each keyword gets its own slot; downloads run side by side
+    slots = [
+        (kw, VIDEO_DIR / f"video_{i:02d}.mp4")
+        for i, kw in enumerate(keywords[:max_videos], 1)
+    ]
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        results = list(pool.map(lambda slot: fetch_video_for_keyword(*slot), slots))
     
     # Fill remaining slots with fallback searches if needed
-    while video_index <= max_videos:
-        print(f"\n Filling slot {video_index} with fallback video")
+    filled = {out_path for (_, out_path), success in zip(slots, results) if success}
+    for video_index in range(1, max_videos + 1):
         out_path = VIDEO_DIR / f"video_{video_index:02d}.mp4"
+        if out_path in filled:
+            continue
+        
+        print(f"\n Filling slot {video_index} with fallback video")
         fallback = random.choice(FALLBACKS)
         
-        if fetch_video_pexels(fallback, out_path):
-            video_index += 1
-        else:
+        if not fetch_video_pexels(fallback, out_path):
             print(f"    Skipping slot {video_index} - no video available")
-            video_index += 1
-        
-        time.sleep(1)
 
     actual_count = len(list(VIDEO_DIR.glob("video_*.mp4")))
     print(f"\n Downloaded {actual_count} videos to videos/")
@@ -1,65 +1,66 @@
 ﻿"""
 Download videos from Google using SerpAPI
 """
-import re
-import requests
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from collections import Counter
-import yaml
+import hashlib
+import shutil
+import json
 import time
 
+from _keywords import extract_keywords, STOPWORDS
+from _ffmpeg_utils import probe_duration, load_config
+from _http import make_session, CHUNK_SIZE
+
 BASE_DIR = Path(__file__).resolve().parent.parent
 OUTPUT_DIR = BASE_DIR / "output"
 VIDEO_DIR = BASE_DIR / "videos"
-CONFIG_PATH = BASE_DIR / "config" / "settings.yaml"
 SCRIPT = OUTPUT_DIR / "script.txt"
 
-VIDEO_DIR.mkdir(exist_ok=True)
+# SerpAPI is paid and rate-limited, and results are stable for hours -
+# responses are kept on disk for a day
+SERPAPI_CACHE_DIR = OUTPUT_DIR / ".serpapi_cache"
+SERPAPI_CACHE_TTL = 24 * 3600
 
-def load_config():
-    """Load settings from YAML config"""
-    with open(CONFIG_PATH, "r", encoding="utf-8") as f:
-        return yaml.safe_load(f)
+SESSION = make_session()
 
-def extract_keywords(text: str, max_words=6):
-    """Extract relevant keywords from script text"""
-    text = text.replace('"', '').replace("'", '')
-    words = re.findall(r"[a-zA-Z]{4,}", text.lower())
-    common = Counter(words)
-    
-    stopwords = {
-        "that", "this", "with", "from", "they", "their", "have", "there",
-        "about", "would", "could", "people", "because", "which", "when",
-        "just", "know", "ever", "those", "thing", "right", "what", "your",
-        "some", "been", "like", "were", "said", "each", "them", "than",
-        "many", "more", "make", "made", "then", "into", "only", "other",
-        "also", "these", "tell", "gets", "gives", "kind", "happen"
-    }
-    
-    relevant = [(word, count) for word, count in common.most_common(20) 
-                if word not in stopwords]
-    return [word for word, _ in relevant[:max_words]]
+VIDEO_DIR.mkdir(exist_ok=True)
+
+def _serpapi_cache_path(keyword: str, num_videos: int) -> Path:
+    """Cache file for a search - word order, case and stopwords don't matter,
+    so "people lifestyle" and "Lifestyle people" share an entry"""
+    words = sorted(set(keyword.lower().split()) - STOPWORDS)
+    key = f"{' '.join(words) or keyword.lower().strip()}|{num_videos}"
+    return SERPAPI_CACHE_DIR / f"{hashlib.sha256(key.encode('utf-8')).hexdigest()}.json"
 
 def fetch_videos_serpapi(keyword: str, api_key: str, num_videos=6):
     """
     Fetch video URLs from Google Videos using SerpAPI
     """
     try:
-        # SerpAPI parameters for Google Videos
-        params = {
-            "engine": "google_videos",
-            "q": keyword,
-            "api_key": api_key,
-            "num": num_videos
-        }
-        
-        response = requests.get("https://serpapi.com/search.json", params=params, timeout=10)
-        
-        if response.status_code != 200:
-            print(f"    SerpAPI returned status {response.status_code}")
-            return []
+        cache_path = _serpapi_cache_path(keyword, num_videos)
+        if cache_path.exists() and time.time() - cache_path.stat().st_mtime < SERPAPI_CACHE_TTL:
+            print(f"   Using cached SerpAPI results for '{keyword}'")
+            data = json.loads(cache_path.read_text(encoding="utf-8"))
+        else:
+            # SerpAPI parameters for Google Videos
+            params = {
+                "engine": "google_videos",
+                "q": keyword,
+                "api_key": api_key,
+                "num": num_videos
+            }
+            
+            response = SESSION.get("https://serpapi.com/search.json", params=params, timeout=10)
+            
+            if response.status_code != 200:
+                print(f"    SerpAPI returned status {response.status_code}")
+                return []
+            
+            data = response.json()
+            SERPAPI_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+            cache_path.write_text(json.dumps(data), encoding="utf-8")
         
-        data = response.json()
         video_results = data.get("video_results", [])
         
         if not video_results:
@@ -88,12 +89,15 @@ def download_video(url: str, out_path: Path) -> bool:
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
         }
         
-        response = requests.get(url, headers=headers, stream=True, timeout=30)
+        response = SESSION.get(url, headers=headers, stream=True, timeout=30)
         
         if response.status_code == 200:
+            # Copy the raw stream in a C-level loop (gzip etc. still decoded)
+            response.raw.decode_content = True
+            # Unlink first - the old file may be hardlinked into the media cache
+            out_path.unlink(missing_ok=True)
             with open(out_path, 'wb') as f:
-                for chunk in response.iter_content(chunk_size=8192):
-                    f.write(chunk)
+                shutil.copyfileobj(response.raw, f, length=CHUNK_SIZE)
             
             size_mb = out_path.stat().st_size / (1024 * 1024)
             print(f"   Downloaded {size_mb:.1f}MB")
@@ -115,7 +119,7 @@ def main():
         print(" script.txt not found")
         return
     
-    config = load_config()
+    config = load_config(job_override=False)
     serpapi_key = config.get('serpapi', {}).get('api_key', '')
     
     if not serpapi_key:
@@ -124,7 +128,7 @@ def main():
     
     # Read script and extract keywords
     script_text = SCRIPT.read_text(encoding="utf-8")
-    keywords = extract_keywords(script_text, max_words=6)
+    keywords = extract_keywords(script_text, max_words=6, defaults=())
     
     print(f"Keywords: {keywords}\n")
     
@@ -133,54 +137,63 @@ def main():
     num_videos_needed = 6  # Default
     
     if audio_path.exists():
-        import subprocess
-        try:
-            result = subprocess.run(
-                ["ffprobe", "-v", "error", "-show_entries", 
-                 "format=duration", "-of", "default=noprint_wrappers=1:nokey=1", 
-                 str(audio_path)],
-                capture_output=True, text=True
-            )
-            audio_duration = float(result.stdout.strip())
+        # Read from the WAV header (ffprobe only for non-PCM files)
+        audio_duration = probe_duration(audio_path)
+        if audio_duration is not None:
             num_videos_needed = max(3, int(audio_duration / 9.0))
             print(f"  Audio: {audio_duration:.1f}s  Need {num_videos_needed} videos\n")
-        except:
-            pass
     
-    # Download videos for each keyword
-    video_count = 0
-    
-    for i, keyword in enumerate(keywords):
-        if video_count >= num_videos_needed:
-            break
-        
-        out_path = VIDEO_DIR / f"video_{video_count + 1:02d}.mp4"
-        
+    # Slots still to fill (files already there are kept)
+    slots = [VIDEO_DIR / f"video_{n:02d}.mp4" for n in range(1, num_videos_needed + 1)]
+    missing = [out_path for out_path in slots if not out_path.exists()]
+    for out_path in slots:
         if out_path.exists():
-            print(f" Video {video_count + 1} already exists: {out_path.name}")
-            video_count += 1
-            continue
-        
-        print(f"\n{'='*60}")
-        print(f"Video {video_count + 1}/{num_videos_needed} - Keyword: '{keyword}'")
-        print(f"{'='*60}")
-        
-        # Search for videos
-        video_urls = fetch_videos_serpapi(keyword, serpapi_key, num_videos=3)
-        
-        if not video_urls:
-            print(f"    No videos found for '{keyword}'")
-            continue
-        
-        # Try each video URL until one works
+            print(f" Video already exists: {out_path.name}")
+    
+    def download_first(job):
+        """Try each video URL for a keyword until one works"""
+        keyword, video_urls, out_path = job
+        print(f"\n Video {out_path.name} - Keyword: '{keyword}'")
         for url in video_urls:
             if download_video(url, out_path):
-                video_count += 1
-                time.sleep(1)  # Rate limiting
-                break
-        
-        if not out_path.exists():
-            print(f"    Failed to download video for '{keyword}'")
+                return True
+        print(f"    Failed to download video for '{keyword}'")
+        return False
+    
+    # Fill the open slots in rounds: search one keyword per open slot at once
+    # (each search is one HTTP round trip, so threads overlap the waiting,
+    # capped at 8 for SerpAPI), download side by side, then hand the next
+    # unused keywords to whatever slots are still empty
+    pending = list(keywords)
+    while missing and pending:
+        search_keywords, pending = pending[:len(missing)], pending[len(missing):]
+        with ThreadPoolExecutor(max_workers=min(8, len(search_keywords))) as pool:
+            search_results = list(pool.map(
+                lambda kw: fetch_videos_serpapi(kw, serpapi_key, num_videos=3), search_keywords
+            ))
+        
+        jobs = []
+        for keyword, video_urls in zip(search_keywords, search_results):
+            if not video_urls:
+                print(f"    No videos found for '{keyword}'")
+                continue
+            jobs.append((keyword, video_urls, missing[len(jobs)]))
+        
+        # Downloads go to different hosts, so they run side by side too
+        if jobs:
+            with ThreadPoolExecutor(max_workers=min(4, len(jobs))) as pool:
+                list(pool.map(download_first, jobs))
+        
+        missing = [out_path for out_path in missing if not out_path.exists()]
+    
+    # Close gaps left by unfilled slots so the videos stay numbered 01, 02, ...
+    filled = [out_path for out_path in slots if out_path.exists()]
+    for n, out_path in enumerate(filled, 1):
+        target = VIDEO_DIR / f"video_{n:02d}.mp4"
+        if out_path != target:
+            out_path.replace(target)
+    
+    video_count = len(filled)
     
     print(f"\n\n{'='*60}")
     print(f" Downloaded {video_count}/{num_videos_needed} videos")
@@ -4,18 +4,18 @@ Vecteezy has free, license-safe videos perfect for TikTok!
 
 Free tier: 500 downloads/month
 """
-import re
-import requests
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from collections import Counter
+import threading
 import random
-import time
-import yaml
+
+from _keywords import extract_keywords
+from _http import make_session, CHUNK_SIZE
+from _ffmpeg_utils import load_config
 
 BASE_DIR = Path(__file__).resolve().parent.parent
 OUTPUT_DIR = BASE_DIR / "output"
 VIDEO_DIR = BASE_DIR / "videos"
-CONFIG_PATH = BASE_DIR / "config" / "settings.yaml"
 
 SCRIPT = OUTPUT_DIR / "script.txt"
 
@@ -23,11 +23,13 @@ VIDEO_DIR.mkdir(exist_ok=True)
 
 # Track downloads
 VECTEEZY_DOWNLOADS = 0
+_DOWNLOADS_LOCK = threading.Lock()
+
+# Account quota as reported at the start of the run
+_QUOTA_CACHE = {"checked": False, "remaining": None, "total": 500}
+_QUOTA_LOCK = threading.Lock()
 
-def load_config():
-    """Load settings from YAML config"""
-    with open(CONFIG_PATH, "r", encoding="utf-8") as f:
-        return yaml.safe_load(f)
+SESSION = make_session()
 
 # Generic fallback keywords if topic words fail
 FALLBACKS = [
@@ -39,42 +41,27 @@ FALLBACKS = [
     "technology"
 ]
 
-def extract_keywords(text: str, max_words=6):
-    """Extract relevant keywords from script text"""
-    # Remove quotes and clean text
-    text = text.replace('"', '').replace("'", '')
-    
-    # Find all words (4+ letters)
-    words = re.findall(r"[a-zA-Z]{4,}", text.lower())
-    common = Counter(words)
-    
-    # Expanded stopwords
-    stopwords = {
-        "that", "this", "with", "from", "they", "their", "have", "there",
-        "about", "would", "could", "people", "because", "which", "when",
-        "just", "know", "ever", "those", "thing", "right", "what", "your",
-        "some", "been", "like", "were", "said", "each", "them", "than",
-        "many", "more", "make", "made", "then", "into", "only", "other",
-        "also", "these", "tell", "gets", "gives", "kind", "happen", "youll",
-        "youre", "never", "believe"
-    }
-    
-    # Extract meaningful keywords
-    keywords = [
-        w for w, _ in common.most_common(20)
-        if w not in stopwords and len(w) >= 4
-    ][:max_words]
+def get_vecteezy_quota(account_id: str, headers: dict):
+    """Return (remaining, total) downloads at the start of this run
     
-    # If not enough keywords, add topic-relevant defaults
-    if len(keywords) < max_words:
-        topic_words = ["lifestyle", "moment", "people", "daily", "experience"]
-        for word in topic_words:
-            if word not in keywords:
-                keywords.append(word)
-                if len(keywords) >= max_words:
-                    break
-    
-    return keywords[:max_words]
+    The account info is only requested on the first call - the quota only
+    drops on our own downloads, which VECTEEZY_DOWNLOADS counts. Returns
+    (None, total) if the check failed.
+    """
+    with _QUOTA_LOCK:
+        if not _QUOTA_CACHE["checked"]:
+            _QUOTA_CACHE["checked"] = True
+            quota_url = f"https://api.vecteezy.com/v2/{account_id}/account/info"
+            try:
+                quota_r = SESSION.get(quota_url, headers=headers, timeout=5)
+                if quota_r.status_code == 200:
+                    quota_data = quota_r.json()
+                    _QUOTA_CACHE["remaining"] = quota_data.get("downloads_remaining", 0)
+                    _QUOTA_CACHE["total"] = quota_data.get("downloads_total", 500)
+            except Exception as e:
+                print(f"    Could not check quota: {e}")
+                pass  # Continue anyway if quota check fails
+        return _QUOTA_CACHE["remaining"], _QUOTA_CACHE["total"]
 
 def fetch_video_vecteezy(keyword: str, out_path: Path) -> bool:
     """Fetch license-safe video from Vecteezy API
@@ -84,7 +71,7 @@ def fetch_video_vecteezy(keyword: str, out_path: Path) -> bool:
     global VECTEEZY_DOWNLOADS
     
     try:
-        config = load_config()
+        config = load_config(job_override=False)
         api_key = config.get("vecteezy", {}).get("api_key", "")
         account_id = config.get("vecteezy", {}).get("account_id", "")
         
@@ -92,25 +79,18 @@ def fetch_video_vecteezy(keyword: str, out_path: Path) -> bool:
             print("    Vecteezy API credentials not configured")
             return False
         
-        # Check account quota first
-        quota_url = f"https://api.vecteezy.com/v2/{account_id}/account/info"
         headers = {"Authorization": f"Bearer {api_key}"}
         
-        try:
-            quota_r = requests.get(quota_url, headers=headers, timeout=5)
-            if quota_r.status_code == 200:
-                quota_data = quota_r.json()
-                remaining = quota_data.get("downloads_remaining", 0)
-                total = quota_data.get("downloads_total", 500)
-                used = total - remaining
-                print(f"   Vecteezy quota: {used}/{total} used, {remaining} remaining")
-                
-                if remaining <= 0:
-                    print(f"    Vecteezy quota exceeded! Skipping.")
-                    return False
-        except Exception as e:
-            print(f"    Could not check quota: {e}")
-            pass  # Continue anyway if quota check fails
+        # Check account quota (fetched once per run, then tracked locally)
+        remaining, total = get_vecteezy_quota(account_id, headers)
+        if remaining is not None:
+            with _DOWNLOADS_LOCK:
+                remaining -= VECTEEZY_DOWNLOADS
+            print(f"   Vecteezy quota: {total - remaining}/{total} used, {remaining} remaining")
+            
+            if remaining <= 0:
+                print(f"    Vecteezy quota exceeded! Skipping.")
+                return False
         
         # Search for free videos (license='free' ensures TikTok safety)
         search_url = f"https://api.vecteezy.com/v2/{account_id}/resources"
@@ -124,7 +104,7 @@ def fetch_video_vecteezy(keyword: str, out_path: Path) -> bool:
         }
         
         print(f"   Searching Vecteezy videos: '{keyword}'...")
-        r = requests.get(search_url, headers=headers, params=params, timeout=10)
+        r = SESSION.get(search_url, headers=headers, params=params, timeout=10)
         
         if r.status_code != 200:
             print(f"    Search failed: HTTP {r.status_code}")
@@ -156,7 +136,7 @@ def fetch_video_vecteezy(keyword: str, out_path: Path) -> bool:
             "file_type": "mp4"
         }
         
-        r = requests.get(download_url, headers=headers, params=download_params, timeout=15)
+        r = SESSION.get(download_url, headers=headers, params=download_params, timeout=15)
         if r.status_code != 200:
             print(f"    Download request failed: HTTP {r.status_code}")
             return False
@@ -170,20 +150,29 @@ def fetch_video_vecteezy(keyword: str, out_path: Path) -> bool:
         
         # Download the video
         print(f"    Fetching video file...")
-        video_response = requests.get(video_url, timeout=30, stream=True)
+        video_response = SESSION.get(video_url, timeout=30, stream=True)
         
         if video_response.status_code == 200:
+            # Bail out on undersized files before any bytes hit the disk
+            content_length = int(video_response.headers.get("Content-Length", "0") or 0)
+            if 0 < content_length <= 50000:
+                print(f"    Video file too small: {content_length} bytes")
+                video_response.close()
+                return False
+            
             # Stream download for large video files
-            total_size = 0
+            # Unlink first - the old file may be hardlinked into the media cache
+            out_path.unlink(missing_ok=True)
             with open(out_path, 'wb') as f:
-                for chunk in video_response.iter_content(chunk_size=8192):
+                for chunk in video_response.iter_content(chunk_size=CHUNK_SIZE):
                     f.write(chunk)
-                    total_size += len(chunk)
             
+            total_size = out_path.stat().st_size
             if total_size > 50000:  # At least 50KB
                 size_mb = total_size / (1024 * 1024)
                 print(f"   Downloaded {size_mb:.1f}MB video")
-                VECTEEZY_DOWNLOADS += 1
+                with _DOWNLOADS_LOCK:
+                    VECTEEZY_DOWNLOADS += 1
                 return True
             else:
                 print(f"    Downloaded file too small: {total_size} bytes")
@@ -207,32 +196,41 @@ def main():
 
     VIDEO_DIR.mkdir(exist_ok=True)
 
-    video_index = 1
     max_videos = 6
-    successful_downloads = 0
     
-    for kw in keywords:
-        if successful_downloads >= max_videos:
-            break
-            
+    def fetch_with_fallback(slot):
+        """Fetch a video for one keyword, falling back to a generic keyword"""
+        kw, out_path = slot
         print(f"\n{'='*60}")
-        print(f"Video {video_index}/{max_videos} - Keyword: '{kw}'")
+        print(f"{out_path.name} - Keyword: '{kw}'")
         print('='*60)
         
-        out_path = VIDEO_DIR / f"video_{video_index:02d}.mp4"
-        
         if fetch_video_vecteezy(kw, out_path):
-            successful_downloads += 1
-            video_index += 1
-        else:
-            # Try fallback keyword
-            fallback = random.choice(FALLBACKS)
-            print(f"\n   Trying fallback: '{fallback}'")
-            if fetch_video_vecteezy(fallback, out_path):
-                successful_downloads += 1
-                video_index += 1
-        
-        time.sleep(0.5)  # Rate limiting
+            return True
+        
+        # Try fallback keyword
+        fallback = random.choice(FALLBACKS)
+        print(f"\n   Trying fallback: '{fallback}'")
+        return fetch_video_vecteezy(fallback, out_path)
+    
+    # Keep two keywords in flight: the next keyword's API calls and download
+    # start while the current file is still streaming to disk
+    slots = [
+        (kw, VIDEO_DIR / f"video_{i:02d}.mp4")
+        for i, kw in enumerate(keywords[:max_videos], 1)
+    ]
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        results = list(pool.map(fetch_with_fallback, slots))
+    
+    # Close gaps left by failed keywords so the videos stay numbered 01, 02, ...
+    successful_downloads = 0
+    for (_, out_path), success in zip(slots, results):
+        if not success:
+            continue
+        successful_downloads += 1
+        target = VIDEO_DIR / f"video_{successful_downloads:02d}.mp4"
+        if out_path != target:
+            out_path.replace(target)
     
     print(f"\n{'='*60}")
     print(f" Downloaded {successful_downloads}/{max_videos} videos to videos/")
@@ -1,10 +1,12 @@
 ﻿from pathlib import Path
 import subprocess
+import os
 import asyncio
 import json
-import yaml
 from datetime import datetime
 
+from _ffmpeg_utils import find_ffmpeg, load_config
+
 BASE_DIR = Path(__file__).resolve().parents[1]
 SCRIPT_PATH = BASE_DIR / "output" / "script.txt"
 STRUCT_JSON_PATH = BASE_DIR / "output" / "script_struct.json"
@@ -12,22 +14,6 @@ HOOK_TXT_PATH = BASE_DIR / "output" / "hook.txt"
 VOICE_PATH = BASE_DIR / "output" / "voice.wav"            # body voice
 VOICE_HOOK_PATH = BASE_DIR / "output" / "voice_hook.wav"   # hook voice
 USAGE_TRACKER = BASE_DIR / "config" / "voice_usage.json"
-CONFIG_PATH = BASE_DIR / "config" / "settings.yaml"
-
-def find_ffmpeg():
-    """Find ffmpeg executable"""
-    import shutil as _shutil
-    paths = [
-        "ffmpeg",
-        r"C:\\ffmpeg\\bin\\ffmpeg.exe",
-        r"C:\\Program Files\\ffmpeg\\bin\\ffmpeg.exe",
-        r"C:\\Program Files (x86)\\ffmpeg\\bin\\ffmpeg.exe",
-        r"C:\\Users\\Walt\\Downloads\\ffmpeg\\ffmpeg-master-latest-win64-gpl\\bin\\ffmpeg.exe",
-    ]
-    for p in paths:
-        if _shutil.which(p):
-            return p
-    return "ffmpeg"  # fall back; may be on PATH
 
 def transcode_to_pcm_wav(src: Path):
     """Transcode any audio file at src to true PCM WAV mono 48kHz, overwriting src.
@@ -35,30 +21,21 @@ def transcode_to_pcm_wav(src: Path):
     """
     if not src.exists():
         return
-    ffmpeg = find_ffmpeg()
     tmp = src.with_suffix(".tmp.wav")
     try:
+        ffmpeg = find_ffmpeg()
         subprocess.run([
-            ffmpeg, "-y", "-nostdin", "-i", str(src),
+            ffmpeg, "-y", "-nostdin", "-loglevel", "error", "-i", str(src),
+            "-threads", "0",
             "-ac", "1", "-ar", "48000", "-sample_fmt", "s16",
             str(tmp)
         ], check=True)
-        # Replace original
-        src.write_bytes(tmp.read_bytes())
-        tmp.unlink(missing_ok=True)
+        # Replace original - a single atomic rename, no copy through memory
+        os.replace(tmp, src)
     except Exception:
         tmp.unlink(missing_ok=True)
         # If transcode fails, keep original
 
-def load_config():
-    """Load settings from YAML config"""
-    # Check for job-specific config first
-    output_dir = BASE_DIR / "output"
-    job_config = output_dir / "settings.yaml"
-    config_path = job_config if job_config.exists() else CONFIG_PATH
-    with open(config_path, "r", encoding="utf-8") as f:
-        return yaml.safe_load(f)
-
 MONTHLY_QUOTA = 65  # Free tier limit
 
 def get_usage_data():
@@ -119,10 +96,13 @@ async def generate_eleven_labs(text: str):
         }
     }
     
-    response = requests.post(url, json=payload, headers=headers, timeout=30)
+    # Stream the audio straight to disk instead of holding it all in memory
+    response = requests.post(url, json=payload, headers=headers, timeout=30, stream=True)
     
     if response.status_code == 200:
-        VOICE_PATH.write_bytes(response.content)
+        with open(VOICE_PATH, "wb") as f:
+            for chunk in response.iter_content(chunk_size=128 * 1024):
+                f.write(chunk)
         update_usage()
         return True
     else:
@@ -130,10 +110,51 @@ async def generate_eleven_labs(text: str):
         return False
 
 async def generate_edge_tts(text: str, out_path: Path, voice: str = "en-US-GuyNeural", rate: str = "+0%"):
-    """Generate voice using Edge TTS (free unlimited)"""
+    """Generate voice using Edge TTS (free unlimited)
+    
+    The MP3 stream is piped straight into ffmpeg, which writes the final PCM
+    WAV - no MP3-in-.wav file on disk and no separate transcode pass. If
+    ffmpeg is missing or fails, the MP3 is saved and transcoded as before.
+    """
     import edge_tts
-    communicate = edge_tts.Communicate(text, voice, rate=rate)
-    await communicate.save(str(out_path))
+    try:
+        proc = await asyncio.create_subprocess_exec(
+            find_ffmpeg(), "-y", "-loglevel", "error",
+            "-f", "mp3", "-i", "pipe:0",
+            "-ac", "1", "-ar", "48000", "-sample_fmt", "s16",
+            str(out_path),
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.DEVNULL,
+            stderr=asyncio.subprocess.DEVNULL,
+        )
+    except OSError:
+        proc = None  # No ffmpeg to pipe into
+    
+    if proc is not None:
+        try:
+            async for chunk in edge_tts.Communicate(text, voice, rate=rate).stream():
+                if chunk["type"] == "audio":
+                    proc.stdin.write(chunk["data"])
+                    # Wait on the pipe without blocking the loop, so the
+                    # other Edge TTS job keeps streaming meanwhile
+                    await proc.stdin.drain()
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # ffmpeg quit early - its exit code says so below
+        finally:
+            proc.stdin.close()
+            returncode = await proc.wait()
+        if returncode == 0:
+            return
+        print(f"ffmpeg could not encode the Edge TTS stream (code {returncode}), saving it directly...")
+    
+    # Keep Edge TTS's own output, then convert it like any other TTS file
+    # (transcode_to_pcm_wav keeps the original if that fails too)
+    await edge_tts.Communicate(text, voice, rate=rate).save(str(out_path))
+    await asyncio.get_running_loop().run_in_executor(None, transcode_to_pcm_wav, out_path)
+
+async def run_concurrently(jobs):
+    """Await several coroutines at once in a single event loop"""
+    await asyncio.gather(*jobs)
 
 def main():
     if not SCRIPT_PATH.exists():
@@ -181,24 +202,29 @@ def main():
             else:
                 print("Eleven Labs failed for body, falling back to Edge TTS...")
         
-        # Fallback to Edge TTS (free, unlimited)
+        # Edge TTS jobs (free, unlimited) - body fallback and hook are
+        # independent, so they're synthesized concurrently in one event loop
+        edge_jobs = []
         if not body_done:
             if remaining == 0:
                 print("Quota reached - using Edge TTS for body")
             else:
                 print("Using Edge TTS for body (backup)")
-            import edge_tts
-            asyncio.run(generate_edge_tts(body_text, VOICE_PATH, selected_voice, voice_rate))
-            print(f"Body voice saved to: {VOICE_PATH}")
-            transcode_to_pcm_wav(VOICE_PATH)
+            edge_jobs.append(("Body", body_text, VOICE_PATH, voice_rate))
 
         # Generate hook voice at natural rate (no speed-up)
         if hook_text:
             print("Generating hook voice (natural rate)...")
+            edge_jobs.append(("Hook", hook_text, VOICE_HOOK_PATH, "+0%"))
+        
+        if edge_jobs:
             import edge_tts
-            asyncio.run(generate_edge_tts(hook_text, VOICE_HOOK_PATH, selected_voice, "+0%"))
-            print(f"Hook voice saved to: {VOICE_HOOK_PATH}")
-            transcode_to_pcm_wav(VOICE_HOOK_PATH)
+            asyncio.run(run_concurrently([
+                generate_edge_tts(text, out_path, selected_voice, rate)
+                for _, text, out_path, rate in edge_jobs
+            ]))
+            for label, _, out_path, _ in edge_jobs:
+                print(f"{label} voice saved to: {out_path}")
         
     except ImportError:
         print("edge-tts not installed. Falling back to pyttsx3...")
@@ -1,5 +1,7 @@
 ﻿import pyttsx3
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
+import os
 
 BASE_DIR = Path(__file__).resolve().parents[1]
 SAMPLES_DIR = BASE_DIR / "temp" / "voice_samples"
@@ -8,6 +10,25 @@ SAMPLES_DIR.mkdir(parents=True, exist_ok=True)
 # Sample text for testing
 SAMPLE_TEXT = "Hey there! This is a sample voice for your TikTok videos. Does this sound good?"
 
+def _render_batch(batch):
+    """Render a batch of voice samples in this worker's own engine
+    
+    pyttsx3 engines aren't safe to share, so each worker process initializes
+    its own. All samples are queued first and the queue is drained once.
+    """
+    engine = pyttsx3.init()
+    engine.setProperty("rate", 140)  # Same rate as your main script
+    
+    output_names = []
+    for name, voice_id, index in batch:
+        output_file = SAMPLES_DIR / f"voice_{index:02d}_{name.replace(' ', '_')}.wav"
+        engine.setProperty("voice", voice_id)
+        engine.save_to_file(SAMPLE_TEXT, str(output_file))
+        output_names.append(output_file.name)
+    
+    engine.runAndWait()  # Single drain for the whole batch
+    return output_names
+
 def main():
     print(" Sampling all available voices...\n")
     
@@ -19,17 +40,18 @@ def main():
     for i, voice in enumerate(voices, 1):
         print(f"{i}. {voice.name}")
         print(f"   ID: {voice.id}")
-        print(f"   Languages: {voice.languages}")
-        
-        # Generate sample
-        output_file = SAMPLES_DIR / f"voice_{i:02d}_{voice.name.replace(' ', '_')}.wav"
-        
-        engine.setProperty("voice", voice.id)
-        engine.setProperty("rate", 140)  # Same rate as your main script
-        engine.save_to_file(SAMPLE_TEXT, str(output_file))
-        engine.runAndWait()
-        
-        print(f"    Sample saved: {output_file.name}\n")
+        print(f"   Languages: {voice.languages}\n")
+    
+    # Synthesis is independent per voice - split the voices into one batch
+    # per worker and render the batches side by side
+    jobs = [(voice.name, voice.id, i) for i, voice in enumerate(voices, 1)]
+    workers = min(len(jobs), os.cpu_count() or 1)
+    if jobs:
+        batches = [jobs[w::workers] for w in range(workers)]
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for output_names in pool.map(_render_batch, batches):
+                for output_name in output_names:
+                    print(f"    Sample saved: {output_name}")
     
     print(f"\n All samples saved to: {SAMPLES_DIR}")
     print("\n Listen to the samples and note the voice number you like!")
@@ -0,0 +1,38 @@
+"""Run the Eleven Labs and Vecteezy credential checks in one process
+
+Both checks share _api_config, so Python startup, the requests import and
+the settings parse are paid once instead of once per script.
+"""
+import sys
+
+import test_elevenlabs
+import test_vecteezy
+
+CHECKS = [
+    ("Eleven Labs", test_elevenlabs.run),
+    ("Vecteezy", test_vecteezy.run),
+]
+
+
+def main():
+    failed = []
+    for name, check in CHECKS:
+        # Each check returns False on any non-200 result; a request that
+        # raises (no network, timeout) fails it too
+        try:
+            ok = check()
+        except Exception as e:
+            print(f"❌ FAILED: {e}")
+            ok = False
+        if not ok:
+            failed.append(name)
+        print()
+
+    if failed:
+        print(f"❌ Failed: {', '.join(failed)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
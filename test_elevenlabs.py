@@ -1,44 +1,71 @@
-import requests
-import yaml
+import sys
 
-# Load config
-with open('config/settings.yaml', 'r') as f:
-    config = yaml.safe_load(f)
+from _api_config import ELEVEN, ELEVEN_HEADERS, make_session, json_dumps
 
-api_key = config['eleven_labs']['api_key']
-voice_id = config['eleven_labs']['voice_id']
+api_key = ELEVEN['api_key']
+voice_id = ELEVEN['voice_id']
 
-print(f"Testing Eleven Labs API...")
-print(f"API Key: {api_key[:20]}...")
-print(f"Voice ID: {voice_id}")
-
-# Test the API
 url = f"https://api.elevenlabs.io/v1/text-to-speech/{voice_id}"
-headers = {
-    "xi-api-key": api_key,
-    "Content-Type": "application/json"
-}
-payload = {
+
+# Fixed request body, encoded to JSON bytes once
+PAYLOAD_BYTES = json_dumps({
     "text": "This is a test.",
     "model_id": "eleven_monolingual_v1",
     "voice_settings": {
         "stability": 0.5,
         "similarity_boost": 0.75
     }
-}
-
-response = requests.post(url, json=payload, headers=headers, timeout=10)
-
-print(f"\nStatus Code: {response.status_code}")
+})
 
-if response.status_code == 200:
+def _ok(response):
     print("✅ SUCCESS! API key and voice ID are valid.")
-    print(f"Audio size: {len(response.content)} bytes")
-elif response.status_code == 401:
+    audio_size = response.headers.get("Content-Length")
+    if audio_size is None:
+        # Chunked response - count the bytes without keeping them
+        audio_size = sum(len(chunk) for chunk in response.iter_content(chunk_size=8192))
+    print(f"Audio size: {audio_size} bytes")
+    return True
+
+def _bad_key(response):
     print("❌ FAILED: Invalid API key (401 Unauthorized)")
     print("Get a new key at: https://elevenlabs.io/app/settings/api-keys")
-elif response.status_code == 404:
+    return False
+
+def _no_voice(response):
     print("❌ FAILED: Voice ID not found (404)")
     print("Add the voice to your library at: https://elevenlabs.io/voice-library")
-else:
+    return False
+
+def _fail(response):
     print(f"❌ FAILED: {response.text}")
+    return False
+
+# Status code -> report handler, which returns whether the check passed
+HANDLERS = {200: _ok, 401: _bad_key, 404: _no_voice}
+
+
+def run():
+    """Check the key and voice ID; returns True if synthesis succeeded"""
+    print(f"Testing Eleven Labs API...")
+    print(f"API Key: {api_key[:20]}...")
+    print(f"Voice ID: {voice_id}")
+
+    # Keep-alive session with a connection pool and retry/backoff
+    session = make_session(ELEVEN_HEADERS)
+
+    # Check the key on the auth-only endpoint first, so a bad key never costs
+    # a synthesis request
+    user_response = session.get("https://api.elevenlabs.io/v1/user", timeout=5)
+    if user_response.status_code != 200:
+        print(f"\n❌ FAILED: API key rejected by /v1/user ({user_response.status_code})")
+        print("Get a new key at: https://elevenlabs.io/app/settings/api-keys")
+        return False
+
+    # Stream the response - the audio itself is never needed, only its size
+    with session.post(url, data=PAYLOAD_BYTES, timeout=10, stream=True) as response:
+        print(f"\nStatus Code: {response.status_code}")
+        return HANDLERS.get(response.status_code, _fail)(response)
+
+
+if __name__ == "__main__":
+    sys.exit(0 if run() else 1)